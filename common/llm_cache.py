@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class LLMCacheMiss(Exception):
+    pass
+
+class LLMCache:
+    def __init__(self, path: str, max_entries: int = 5000, strict: bool = False, flush_every: int = 50):
+        self.path = path
+        self.max_entries = max_entries
+        # strict is the deterministic test mode: a miss raises instead of calling the api
+        self.strict = strict
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # a hit only bumps last_used in memory, written with the next set, once flush_every keys were hit and on close
+        self.flush_every = flush_every
+        self._touched: Dict[str, float] = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # with wal a crash can lose the last commits but not corrupt the file, fine for a cache
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(params: Dict[str, Any]) -> str:
+        # model, messages and sampling parameters, stream doesn't change the answer
+        relevant = {key: value for key, value in params.items() if key != "stream"}
+        return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def get(self, params: Dict[str, Any]) -> Optional[str]:
+        key = self.make_key(params)
+        with self._lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                if self.strict:
+                    raise LLMCacheMiss(f"No cached response for prompt {key[:12]}")
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.flush_every:
+                self._flush_touched()
+                self.conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, params: Dict[str, Any], response: str):
+        key = self.make_key(params)
+        now = time.time()
+        with self._lock:
+            # the eviction below has to see the recent hits
+            self._flush_touched()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            )
+            # least recently used entries go first once the cache is full
+            self.conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self.conn.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self.conn.executemany("UPDATE responses SET last_used = ? WHERE key = ?",
+                                  [(last_used, key) for key, last_used in self._touched.items()])
+            self._touched.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self.conn.commit()
+            self.conn.close()
@@ -0,0 +1,94 @@
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Any, Dict, List
+
+_CLOSE = object()
+
+class LogWriter:
+    # interaction logs as compact jsonl, written by a background thread in batches. write() only queues the record.
+    # the current segment is <prefix>.jsonl, past max_bytes it is renamed and gzipped and a new one is started
+    def __init__(self, directory: str, prefix: str = "interactions", max_bytes: int = 5 * 1024 * 1024,
+                 batch_size: int = 50, flush_interval: float = 1.0, compress: bool = True):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.path = os.path.join(directory, f"{prefix}.jsonl")
+        self.written = 0
+        self.dropped = 0
+        self.closed = False
+        os.makedirs(directory, exist_ok=True)
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"log-writer-{prefix}", daemon=True)
+        self._thread.start()
+        # whatever is still queued gets written when the process exits normally
+        atexit.register(self.close)
+
+    def write(self, record: Dict[str, Any]):
+        if self.closed:
+            self.dropped += 1
+            return
+        self._queue.put(record)
+
+    def _run(self):
+        file = open(self.path, "a", encoding="utf-8")
+        try:
+            while True:
+                batch, closing = self._next_batch()
+                if batch:
+                    lines = []
+                    for record in batch:
+                        try:
+                            lines.append(json.dumps(record, ensure_ascii=False, default=str))
+                        except (TypeError, ValueError):
+                            self.dropped += 1
+                    file.write("".join(line + "\n" for line in lines))
+                    file.flush()
+                    self.written += len(lines)
+                    if file.tell() >= self.max_bytes:
+                        file.close()
+                        self._rotate()
+                        file = open(self.path, "a", encoding="utf-8")
+                if closing:
+                    return
+        finally:
+            file.close()
+
+    def _next_batch(self) -> tuple[List[Dict[str, Any]], bool]:
+        # blocks for the first record, then takes whatever else arrives within flush_interval up to batch_size
+        batch = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while item is not _CLOSE:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return batch, False
+        return batch, True
+
+    def _rotate(self):
+        # time_ns keeps two rotations in the same second from overwriting each other
+        rotated = os.path.join(self.directory, f"{self.prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}.jsonl")
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+
+    def close(self, timeout: float = 5.0):
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout)
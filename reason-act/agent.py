@@ -1,68 +1,121 @@
 from datetime import datetime
-import os
 import re
-from typing import List, Dict, Any, Tuple, Optional, Deque
-from collections import deque
+from typing import List, Dict, Any, Tuple, Optional, Callable, Awaitable
 from tools import Tool, get_all_tool_info
-import openai
 from config import OPENAI_API_KEY
 import time
 import json
+import asyncio
+import threading
 from colorama import init, Fore, Style
 from email_manager import EmailManager
+from concurrent.futures import ThreadPoolExecutor
+from planner import PlanExecutor, PlanError, parse_plan
+from prompt import REACT_PROMPT, USER_CONTEXT_PROMPT, PLAN_PROMPT, ANSWER_PROMPT, SUMMARY_PROMPT
+from llm_cache import LLMCache
+from context_window import ContextWindow
+from log_writer import LogWriter
+from telemetry import telemetry
+from recording import Recording, RecordedTool
 
 # Initialize colorama
 init(autoreset=True)
 
+SKIPPED_ACTIONS = "Skipped"
+
 class ReActAgent:
-    def __init__(self, tools: List[Tool], context_window: int = 5, email_manager: EmailManager = None):
+    def __init__(self, tools: List[Tool], context_token_budget: int = 3000, email_manager: EmailManager = None, stream_thoughts: bool = True,
+                 max_parallel_actions: int = 4, temperature: float = 0.7, llm_cache: Optional[LLMCache] = None,
+                 llm_cache_sites: Tuple[str, ...] = ("thought", "plan", "answer", "summary"), summarize_context: bool = True,
+                 log_dir: str = "reason-act/logs", recording: Optional[Recording] = None,
+                 clock: Optional[Callable[[], datetime]] = None):
+        # llm answers, tool results and the clock are recorded to a file, or replayed from one
+        self.recording = recording
+        # what the prompt's date and time come from, a fixed clock keeps strict llm cache runs deterministic
+        self.clock = recording.now if recording is not None else clock or datetime.now
+        if recording is not None:
+            tools = [RecordedTool(tool, recording) for tool in tools]
         self.tools = {tool.name: tool for tool in tools}
         self.tool_info = get_all_tool_info(tools)
+        # built once, the prompt prefix has to be byte identical between calls for prompt caching to hit
+        tool_descriptions = "\n".join([f"- {tool['name']}({', '.join(tool['args'])}): {tool['description']}" for tool in self.tool_info])
+        self.static_prompt = REACT_PROMPT.format(tool_descriptions=tool_descriptions, max_actions=max_parallel_actions)
+        self.plan_prompt = PLAN_PROMPT.format(tool_descriptions=tool_descriptions)
         self.thought_history = []
         self.action_history = []
-        self.gpt_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        self.context_window: Deque[Dict[str, str]] = deque(maxlen=context_window)
+        # openai is slow to import, the clients are built on first use or by warm_up in the background
+        self._gpt_client = None
+        self._async_gpt_client = None
+        self._client_lock = threading.Lock()
+        # bounded by tokens, not entries: old turns are folded into a running summary (or dropped) past the budget
+        self.context_window = ContextWindow(
+            token_budget=context_token_budget,
+            summarizer=self._summarize_context if summarize_context else None
+        )
         self.metrics = {
             "total_queries": 0,
             "total_thoughts": 0,
             "total_actions": 0,
             "total_time": 0,
         }
-        self.log_dir = "reason-act/logs"
-        os.makedirs(self.log_dir, exist_ok=True)
+        self.log_dir = log_dir
+        # interactions are appended to jsonl segments by a background thread, off the query path
+        self.log_writer = LogWriter(self.log_dir)
         self.email_manager = email_manager or EmailManager()
+        # stream thoughts and cut the completion as soon as a full action or final answer is in
+        self.stream_thoughts = stream_thoughts
+        # independent actions of the same step run together on this pool, 1 means one action per step
+        self.max_parallel_actions = max_parallel_actions
+        self.action_pool = ThreadPoolExecutor(max_workers=max_parallel_actions) if max_parallel_actions > 1 else None
+        self.plan_executor = PlanExecutor(self.tools, max_workers=max_parallel_actions)
+        self.temperature = temperature
+        # identical prompts are answered from disk, only for the call sites listed in llm_cache_sites
+        self.llm_cache = llm_cache
+        self.llm_cache_sites = llm_cache_sites
+
+    @property
+    def gpt_client(self):
+        if self._gpt_client is None:
+            self.warm_up()
+        return self._gpt_client
+
+    @gpt_client.setter
+    def gpt_client(self, client):
+        self._gpt_client = client
+
+    @property
+    def async_gpt_client(self):
+        if self._async_gpt_client is None:
+            self.warm_up()
+        return self._async_gpt_client
+
+    @async_gpt_client.setter
+    def async_gpt_client(self, client):
+        self._async_gpt_client = client
+
+    def warm_up(self):
+        with self._client_lock:
+            if self._gpt_client is None or self._async_gpt_client is None:
+                import openai
+                self._gpt_client = self._gpt_client or openai.OpenAI(api_key=OPENAI_API_KEY)
+                self._async_gpt_client = self._async_gpt_client or openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
 
     def run(self, query: str) -> str:
         start_time = time.time()
         self.metrics["total_queries"] += 1
 
         try:
-            self.thought_history = []
-            self.action_history = []
-            
-            # Add the new query to the context window
-            self.context_window.append({"role": "user", "content": query})
-            
+            self._start_query(query)
             counter = 1
             
             while True:
-                # Generate context from the sliding window
-                context = self.get_system_prompt() + "\n" + "\n".join([f"{item['role'].capitalize()}: {item['content']}" for item in self.context_window])
-                
                 # print the system prompt
                 #print(Fore.MAGENTA + f"\n{self.get_system_prompt()}")
                 
                 # Reasoning step
-                thought = self._generate_thought(context)
-                #self.thought_history.append(thought)
-                self.context_window.append({"role": "assistant", "content": thought})
-                
-                #self.metrics["total_thoughts"] += 1
-
-                if "Final Answer:" in thought:
-                    final_answer = self._extract_final_answer(thought)
-                    self.context_window.append({"role": "assistant", "content": final_answer})
-                    print(Fore.GREEN + f"\nFinal Answer: {final_answer}")
+                thought = self._generate_thought()
+                final_answer = self._record_thought(thought)
+                if final_answer is not None:
                     return final_answer
                 
                 print(Fore.YELLOW + f"\n[Step {counter}]")
@@ -70,19 +123,13 @@ class ReActAgent:
                 print(Fore.WHITE + f"\n{thought}")
                 
                 # Acting step
-                action, action_input = self._parse_action(thought)
-                if action is None:
-                    self.context_window.append({"role": "system", "content": action_input})
-                    #print(Fore.RED + f"\nInvalid action: {action_input}")
+                with telemetry.span("parse"):
+                    actions = self._parse_actions(thought)
+                if not self._check_actions(actions):
                     continue  # Invalid action, generate a new thought
-                
-                result = self.tools[action](action_input)
-                #self.action_history.append((action, action_input, result))
-                self.context_window.append({"role": "system", "content": f"Action: {action}({action_input})\nResult: {result}"})
-                
-                print(Fore.BLUE + f"\nExecuting action: {action}({action_input})")
-                if action is not None:
-                    self.metrics["total_actions"] += 1
+
+                observations = self._execute_actions(actions)
+                self._record_observations(actions, observations)
 
         except Exception as e:
             raise
@@ -90,20 +137,444 @@ class ReActAgent:
         finally:
             end_time = time.time()
             self.metrics["total_time"] += (end_time - start_time)
+            telemetry.observe("query_seconds", end_time - start_time, mode="react")
+            self._update_metrics()
+
+    async def arun(self, query: str) -> str:
+        # same loop as run, but the llm and tool calls don't block the event loop
+        start_time = time.time()
+        self.metrics["total_queries"] += 1
+
+        try:
+            self._start_query(query)
+            counter = 1
+
+            while True:
+                thought = await self._agenerate_thought()
+                final_answer = self._record_thought(thought)
+                if final_answer is not None:
+                    return final_answer
+
+                print(Fore.YELLOW + f"\n[Step {counter}]")
+                counter += 1
+                print(Fore.WHITE + f"\n{thought}")
+
+                with telemetry.span("parse"):
+                    actions = self._parse_actions(thought)
+                if not self._check_actions(actions):
+                    continue
+
+                observations = await self._aexecute_actions(actions)
+                self._record_observations(actions, observations)
+
+        finally:
+            self.metrics["total_time"] += (time.time() - start_time)
+            telemetry.observe("query_seconds", time.time() - start_time, mode="react")
+            self._update_metrics()
+
+    def _update_metrics(self):
+        self.metrics["tool_cache"] = {name: tool.cache.stats() for name, tool in self.tools.items() if tool.cache is not None}
+        if self.llm_cache is not None:
+            self.metrics["llm_cache"] = self.llm_cache.stats()
+        # where the time went, the full histograms are in telemetry
+        self.metrics["llm_time"] = round(telemetry.total("llm_request_seconds"), 3)
+        self.metrics["tool_time"] = round(telemetry.total("tool_seconds"), 3)
+        self.metrics["parse_time"] = round(telemetry.total("parse_seconds"), 3)
+        self.metrics["prompt_tokens"] = int(telemetry.total("llm_prompt_tokens_total"))
+        self.metrics["completion_tokens"] = int(telemetry.total("llm_completion_tokens_total"))
+        self.metrics["invalid_actions"] = int(telemetry.total("invalid_actions_total"))
+
+    def _start_query(self, query: str):
+        self.thought_history = []
+        self.action_history = []
+        
+        # Add the new query to the context window
+        self.context_window.start_turn()
+        self.context_window.append({"role": "user", "content": query})
+
+    def _build_messages(self) -> List[Dict[str, str]]:
+        # static prefix, then the small dynamic part, then the sliding window as real chat messages
+        return [
+            {"role": "system", "content": self.static_prompt},
+            {"role": "system", "content": self.get_user_context()},
+            *[{"role": item["role"], "content": item["content"]} for item in self.context_window]
+        ]
+
+    def _record_thought(self, thought: str) -> Optional[str]:
+        #self.thought_history.append(thought)
+        self.context_window.append({"role": "assistant", "content": thought})
+        
+        self.metrics["total_thoughts"] += 1
+
+        if "Final Answer:" in thought:
+            final_answer = self._extract_final_answer(thought)
+            self.context_window.append({"role": "assistant", "content": final_answer})
+            print(Fore.GREEN + f"\nFinal Answer: {final_answer}")
+            return final_answer
+        return None
+
+    def _check_actions(self, actions: List[Tuple[Optional[str], Optional[str]]]) -> bool:
+        valid_actions = [(action, action_input) for action, action_input in actions if action is not None]
+        # the note about actions past max_parallel_actions is not an invalid action
+        invalid = [error for action, error in actions if action is None and not error.startswith(SKIPPED_ACTIONS)]
+        if invalid:
+            telemetry.inc("invalid_actions_total", len(invalid))
+        if not valid_actions:
+            # the model gets the errors back and has to think again
+            telemetry.inc("invalid_action_retries_total")
+            self.context_window.append({"role": "system", "content": "\n".join(error for _, error in actions)})
+            #print(Fore.RED + f"\nInvalid action: {action_input}")
+            return False
+
+        for action, action_input in valid_actions:
+            print(Fore.BLUE + f"\nExecuting action: {action}({action_input})")
+        return True
+
+    def _record_observations(self, actions: List[Tuple[Optional[str], Optional[str]]], observations: List[str]):
+        #self.action_history.append((action, action_input, result))
+        # all the observations of the step go back in a single context update
+        self.context_window.append({"role": "system", "content": "\n\n".join(observations)})
+        self.metrics["total_actions"] += len([action for action, _ in actions if action is not None])
+
+    def run_plan(self, query: str) -> str:
+        # plan-then-execute: one call to plan every action, run the graph, one call to answer
+        start_time = time.time()
+        conversation = "\n".join([f"{item['role'].capitalize()}: {item['content']}" for item in self.context_window])
+
+        try:
+            steps = parse_plan(self._generate_plan(query, conversation), self.tools)
+        except PlanError as e:
+            print(Fore.RED + f"\nCould not plan the query ({e}), falling back to the ReAct loop.")
+            self.metrics["total_time"] += (time.time() - start_time)
+            return self.run(query)
+
+        self.metrics["total_queries"] += 1
+        try:
+            self.context_window.start_turn()
+            self.context_window.append({"role": "user", "content": query})
+
+            def on_start(step, action_input):
+                print(Fore.BLUE + f"\nExecuting action [{step['id']}]: {step['action']}({action_input})")
+
+            results = self.plan_executor.execute(steps, on_start=on_start)
+            self.metrics["total_actions"] += len(steps)
+            observations = "\n\n".join(
+                f"Action [{step['id']}]: {step['action']}\nResult: {results[step['id']]}" for step in steps
+            )
+            if observations:
+                self.context_window.append({"role": "system", "content": observations})
+
+            final_answer = self._generate_answer(query, observations or "No actions were needed.")
+            self.context_window.append({"role": "assistant", "content": final_answer})
+            print(Fore.GREEN + f"\nFinal Answer: {final_answer}")
+            return final_answer
 
-    def _generate_thought(self, context: str) -> str:
-        response = self.gpt_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": self.get_system_prompt()},
-                {"role": "user", "content": context}
+        finally:
+            self.metrics["total_time"] += (time.time() - start_time)
+            telemetry.observe("query_seconds", time.time() - start_time, mode="plan")
+            self._update_metrics()
+
+    def _generate_plan(self, query: str, conversation: str) -> str:
+        return self._complete("plan", {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {"role": "system", "content": self.plan_prompt},
+                {"role": "system", "content": self.get_user_context()},
+                {"role": "user", "content": f"Conversation so far:\n{conversation}\n\nQuestion: {query}"}
             ],
-            max_tokens=600,
-            n=1,
-            stop=None,
-            temperature=0.7,
-        )
-        return response.choices[0].message.content.strip()
+            "max_tokens": 800,
+            "temperature": 0,
+            "response_format": {"type": "json_object"},
+        })
+
+    def _generate_answer(self, query: str, observations: str) -> str:
+        return self._complete("answer", {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {"role": "system", "content": ANSWER_PROMPT},
+                {"role": "system", "content": self.get_user_context()},
+                {"role": "user", "content": f"Question: {query}\n\nResults:\n{observations}"}
+            ],
+            "max_tokens": 600,
+            "temperature": self.temperature,
+        })
+
+    def _summarize_context(self, summary: str, evicted: List[Dict[str, str]]) -> str:
+        turns = "\n".join([f"{item['role'].capitalize()}: {item['content']}" for item in evicted])
+        return self._complete("summary", {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Current summary:\n{summary or 'None'}\n\nNew messages:\n{turns}"}
+            ],
+            "max_tokens": 300,
+            "temperature": 0,
+        })
+
+    def _complete(self, site: str, params: Dict[str, Any]) -> str:
+        return self._llm(site, params, self._request_completion)
+
+    def _llm(self, site: str, params: Dict[str, Any], request: Callable[[str, Dict[str, Any]], str]) -> str:
+        # every llm answer comes through here: from the recording in a replay, otherwise the cache or the api
+        if self.recording is not None and self.recording.replay:
+            return self.recording.replay_llm(site, params)
+        content = self._llm_cache_get(site, params)
+        if content is None:
+            content = request(site, params)
+            self._llm_cache_set(site, params, content)
+        if self.recording is not None:
+            self.recording.record_llm(site, params, content)
+        return content
+
+    async def _allm(self, site: str, params: Dict[str, Any], request: Callable[[str, Dict[str, Any]], Awaitable[str]]) -> str:
+        if self.recording is not None and self.recording.replay:
+            return self.recording.replay_llm(site, params)
+        # sqlite blocks, the cache is read and written off the event loop
+        content = await asyncio.to_thread(self._llm_cache_get, site, params)
+        if content is None:
+            content = await request(site, params)
+            await asyncio.to_thread(self._llm_cache_set, site, params, content)
+        if self.recording is not None:
+            self.recording.record_llm(site, params, content)
+        return content
+
+    def _request_completion(self, site: str, params: Dict[str, Any]) -> str:
+        with telemetry.span("llm_request", site=site):
+            response = self.gpt_client.chat.completions.create(**params)
+        content = response.choices[0].message.content.strip()
+        self._record_tokens(site, params, content, getattr(response, "usage", None))
+        return content
+
+    def _record_tokens(self, site: str, params: Dict[str, Any], content: str, usage: Any = None):
+        # streamed thoughts are cut before the usage chunk arrives, those are counted locally
+        if usage is not None:
+            prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        else:
+            counter = self.context_window.counter
+            # about 4 tokens of chat formatting per message
+            prompt_tokens = sum(counter.count(message["content"]) + 4 for message in params["messages"])
+            completion_tokens = counter.count(content)
+        telemetry.inc("llm_requests_total", site=site)
+        telemetry.inc("llm_prompt_tokens_total", prompt_tokens, site=site)
+        telemetry.inc("llm_completion_tokens_total", completion_tokens, site=site)
+
+    def _llm_cache_get(self, site: str, params: Dict[str, Any]) -> Optional[str]:
+        if self.llm_cache is None or site not in self.llm_cache_sites:
+            return None
+        cached = self.llm_cache.get(params)
+        if cached is not None:
+            telemetry.inc("llm_cache_hits_total", site=site)
+        return cached
+
+    def _llm_cache_set(self, site: str, params: Dict[str, Any], content: str):
+        if self.llm_cache is not None and site in self.llm_cache_sites:
+            self.llm_cache.set(params, content)
+
+    def _thought_params(self) -> Dict[str, Any]:
+        return {
+            "model": "gpt-4o-mini",
+            "messages": self._build_messages(),
+            "max_tokens": 600,
+            "n": 1,
+            "stop": None,
+            "temperature": self.temperature,
+        }
+
+    def _generate_thought(self) -> str:
+        self.context_window.compact()
+        params = self._thought_params()
+        return self._llm("thought", params, self._stream_thought if self.stream_thoughts else self._request_completion)
+
+    def _stream_thought(self, site: str, params: Dict[str, Any]) -> str:
+        with telemetry.span("llm_request", site=site):
+            start = time.perf_counter()
+            stream = self.gpt_client.chat.completions.create(**params, stream=True)
+            thought = ""
+            try:
+                for chunk in stream:
+                    first = not thought
+                    thought, done = self._append_chunk(thought, chunk)
+                    if first and thought:
+                        telemetry.observe("llm_time_to_first_token_seconds", time.perf_counter() - start, site=site)
+                    if done:
+                        break
+            finally:
+                # closing the stream cancels the completion, no more tokens are generated
+                stream.close()
+        thought = thought.strip()
+        self._record_tokens(site, params, thought)
+        return thought
+
+    async def _agenerate_thought(self) -> str:
+        # compacting may call the llm to summarize, keep it off the event loop
+        await asyncio.to_thread(self.context_window.compact)
+        return await self._allm("thought", self._thought_params(), self._arequest_thought)
+
+    async def _arequest_thought(self, site: str, params: Dict[str, Any]) -> str:
+        usage = None
+        with telemetry.span("llm_request", site=site):
+            start = time.perf_counter()
+            if not self.stream_thoughts:
+                response = await self.async_gpt_client.chat.completions.create(**params)
+                thought = response.choices[0].message.content.strip()
+                usage = getattr(response, "usage", None)
+            else:
+                stream = await self.async_gpt_client.chat.completions.create(**params, stream=True)
+                thought = ""
+                try:
+                    async for chunk in stream:
+                        first = not thought
+                        thought, done = self._append_chunk(thought, chunk)
+                        if first and thought:
+                            telemetry.observe("llm_time_to_first_token_seconds", time.perf_counter() - start, site=site)
+                        if done:
+                            break
+                finally:
+                    await stream.close()
+                thought = thought.strip()
+
+        self._record_tokens(site, params, thought, usage)
+        return thought
+
+    def _append_chunk(self, thought: str, chunk: Any) -> Tuple[str, bool]:
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            return thought, False
+        thought += chunk.choices[0].delta.content
+        cut = self._find_thought_end(thought)
+        if cut is not None:
+            # everything after this point is the model talking to itself, drop it
+            return thought[:cut], True
+        return thought, False
+
+    def _find_thought_end(self, thought: str) -> Optional[int]:
+        final_match = re.search(r"Final Answer:", thought)
+        if final_match:
+            # the answer itself comes after the marker, only stop if the model starts inventing a new turn
+            invented = re.search(r"\n\s*(Observation|Question|Thought):", thought[final_match.end():])
+            return final_match.end() + invented.start() if invented else None
+
+        action_match = re.search(r"Action:\s*\w+\(", thought)
+        if not action_match:
+            return None
+        end = self._find_closing_paren(thought, action_match.end())
+        if end is None or self.max_parallel_actions <= 1:
+            return end
+
+        # more actions may follow, wait for the next line to see if it is another one
+        for _ in range(self.max_parallel_actions - 1):
+            next_line = re.match(r"[^\n]*\n\s*(\S[^\n]*)", thought[end:])
+            if next_line is None:
+                return None
+            line = next_line.group(1)
+            if not line.startswith("Action:"):
+                # still streaming the keyword, or the model moved on (PAUSE, Observation...)
+                return None if "Action:".startswith(line) else end
+            next_action = re.match(r"Action:\s*\w+\(", line)
+            if next_action is None:
+                return None
+            next_end = self._find_closing_paren(thought, end + next_line.start(1) + next_action.end())
+            if next_end is None:
+                return None
+            end = next_end
+        return end
+
+    def _find_closing_paren(self, text: str, start: int) -> Optional[int]:
+        # start points right after the opening paren of the action
+        depth = 1
+        in_quotes = False
+        quote_char = None
+        escaped = False
+
+        for i in range(start, len(text)):
+            char = text[i]
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif in_quotes:
+                if char == quote_char:
+                    in_quotes = False
+                    quote_char = None
+            elif char == '"' or (char == "'" and text[i - 1] in "(,:=[{ \n"):
+                # an apostrophe inside a word (what's, Valentin's) doesn't open a quote
+                in_quotes = True
+                quote_char = char
+            elif char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+        return None
+
+    def _parse_actions(self, thought: str) -> List[Tuple[Optional[str], Optional[str]]]:
+        actions = []
+        skipped = []
+        for match in re.finditer(r"Action:\s*\w+\(", thought):
+            end = self._find_closing_paren(thought, match.end())
+            if end is None:
+                continue
+            if len(actions) == self.max_parallel_actions:
+                skipped.append(thought[match.start() + len("Action:"):end].strip())
+                continue
+            actions.append(self._parse_action(thought[match.start():end]))
+
+        if not actions:
+            # fall back to the single action parser, it is more lenient with unbalanced input
+            actions.append(self._parse_action(thought))
+        if skipped:
+            # the model has to know they didn't run, or it answers as if they had
+            telemetry.inc("skipped_actions_total", len(skipped))
+            actions.append((None, f"{SKIPPED_ACTIONS} {', '.join(skipped)}: at most {self.max_parallel_actions} actions run per step, "
+                                  "repeat them in the next step if they are still needed."))
+        return actions
+
+    def _execute_actions(self, actions: List[Tuple[Optional[str], Optional[str]]]) -> List[str]:
+        observations: List[Optional[str]] = [None] * len(actions)
+        futures = {}
+
+        def collect():
+            for i, future in futures.items():
+                action, action_input = actions[i]
+                observations[i] = f"Action: {action}({action_input})\nResult: {future.result()}"
+            futures.clear()
+
+        # in the order the model wrote them: read-only actions start right away and run together, an action with side
+        # effects waits for everything before it and everything after it waits for it (a draft is written before it is read)
+        for i, (action, action_input) in enumerate(actions):
+            if action is None:
+                observations[i] = action_input
+            elif self.action_pool is not None and self.tools[action].parallel_safe:
+                futures[i] = self.action_pool.submit(self.tools[action].invoke, action_input)
+            else:
+                collect()
+                observations[i] = f"Action: {action}({action_input})\nResult: {self.tools[action].invoke(action_input)}"
+        collect()
+
+        return observations
+
+    async def _aexecute_actions(self, actions: List[Tuple[Optional[str], Optional[str]]]) -> List[str]:
+        observations: List[Optional[str]] = [None] * len(actions)
+        semaphore = asyncio.Semaphore(self.max_parallel_actions)
+
+        async def run_parallel(i: int, action: str, action_input: str):
+            async with semaphore:
+                observations[i] = f"Action: {action}({action_input})\nResult: {await self.tools[action].ainvoke(action_input)}"
+
+        # same order as _execute_actions, an action with side effects is a barrier for the ones around it
+        parallel = []
+        for i, (action, action_input) in enumerate(actions):
+            if action is None:
+                observations[i] = action_input
+            elif self.max_parallel_actions > 1 and self.tools[action].parallel_safe:
+                parallel.append(asyncio.create_task(run_parallel(i, action, action_input)))
+            else:
+                await asyncio.gather(*parallel)
+                parallel.clear()
+                observations[i] = f"Action: {action}({action_input})\nResult: {await self.tools[action].ainvoke(action_input)}"
+
+        await asyncio.gather(*parallel)
+        return observations
 
     def _parse_action(self, thought: str) -> Tuple[Optional[str], Optional[str]]:
         action_match = re.search(r"Action:\s*(\w+)\((.*)\)", thought, re.DOTALL)
@@ -185,49 +656,22 @@ class ReActAgent:
         return thought.split("Final Answer:")[-1].strip()
 
     def get_system_prompt(self) -> str:
-        tool_descriptions = "\n".join([f"- {tool['name']}({', '.join(tool['args'])}): {tool['description']}" for tool in self.tool_info])
-        return f"""
-You run in a loop of Thought, Action, PAUSE, Observation.
-At the end of the loop you output a Final Answer
-Use Thought to describe your thoughts about the question you have been asked.
-Use Action to run one of the actions available to you - then return PAUSE.
-Observation will be the result of running those actions.
-
-Your available actions are:
-
-{tool_descriptions}
+        return self.static_prompt + self.get_user_context()
 
-Example session:
-
-Question: What is the capital of France?
-Thought: I should look up France on Wikipedia
-Action: wikipedia: France
-PAUSE
-
-You will be called again with this:
-
-Observation: France is a country. The capital is Paris.
-
-You then output:
-
-Final Answer: The capital of France is Paris.
-
-In case needed, here you have context about the user:
-- His name is Valentin
-- He lives in Mar del Plata, Buenos Aires,Argentina
-- Today's date is {datetime.now().strftime("%Y-%m-%d")} - {datetime.now().strftime("%H:%M:%S")}
-"""
+    def get_user_context(self) -> str:
+        # minute resolution, enough for "in two hours" or "tonight", and the prompt stays identical across the
+        # steps of a query. it comes after the static prefix, so provider prompt caching is unaffected
+        now = self.clock()
+        return USER_CONTEXT_PROMPT.format(date=now.strftime("%Y-%m-%d"), time=now.strftime("%H:%M"))
             
     def save_interaction_log(self, query: str, response: str):
-        log_data = {
+        # copies, the writer serializes later and the agent keeps appending to its histories
+        self.log_writer.write({
+            "timestamp": datetime.now().isoformat(),
             "query": query,
             "response": response,
-            "thought_history": self.thought_history,
-            "action_history": self.action_history,
-            "metrics": self.metrics,
+            "thought_history": list(self.thought_history),
+            "action_history": list(self.action_history),
+            "metrics": dict(self.metrics),
             "context_window": list(self.context_window)
-        }
-        timestamp = time.strftime("%Y%m%d-%H%M%S")
-        log_filename = os.path.join(self.log_dir, f"interaction_{timestamp}.json")
-        with open(log_filename, 'w') as log_file:
-            json.dump(log_data, log_file, indent=2)
+        })
@@ -0,0 +1,272 @@
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, List, Tuple
+from fake_google import FakeCalendarService, FakeGmailService
+from fake_servers import FakeOpenAI, FakeOpenWeather, FakeTavily
+
+# end to end latency of ReActAgent.run and Reddtriever.generate without any live service: openai, tavily and
+# openweather are local http servers, gmail and calendar the fake_google clients. a fixed corpus of queries runs
+# through both agents at each concurrency level and the report has latency percentiles, llm and tool calls per
+# query and throughput.
+# python reason-act/benchmark.py --concurrency 1,4 --rounds 3 --llm-latency 0.4 --json results.json
+# python reason-act/benchmark.py --baseline results.json   (exit code 1 on a regression)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+REDDTRIEVER_BENCHMARK = os.path.join(os.path.dirname(script_dir), "reddtriever", "benchmark.py")
+
+REDDTRIEVER_ANSWER = "Most people on Reddit agree on a few points [1][2]:\n\n- The first one comes up in most threads [1].\n" \
+                     "- Others disagree and prefer the alternative [3]."
+
+def build_corpus(today: date) -> List[Dict[str, Any]]:
+    # the scripted llm answers each query with these (trigger, reply) pairs, the trigger is looked for in the last
+    # message: the query itself, then the observation of the previous step, which starts with "Action: name(input)"
+    tomorrow, next_week = today + timedelta(days=1), today + timedelta(days=7)
+    return [
+        {"query": "What's the weather like in Paris?", "react": [
+            ("What's the weather like in Paris?", "Thought: I need the current weather in Paris.\nAction: get_weather(Paris)\nPAUSE"),
+            ("Action: get_weather(Paris)", "Thought: I have the weather.\nFinal Answer: It is 18.5°C with scattered clouds in Paris."),
+        ]},
+        {"query": "Do I have anything on my calendar tomorrow?", "react": [
+            ("Do I have anything on my calendar tomorrow?",
+             f"Thought: I should look for events tomorrow.\nAction: find_event_in_range(\"\", {tomorrow}, {tomorrow + timedelta(days=1)})\nPAUSE"),
+            (f"Action: find_event_in_range(, {tomorrow}, {tomorrow + timedelta(days=1)})",
+             "Thought: I found the events.\nFinal Answer: Tomorrow you have the team standup at 10:00 and a dentist appointment at 17:30."),
+        ]},
+        {"query": "Any emails from Alice about the invoice?", "react": [
+            ("Any emails from Alice about the invoice?",
+             "Thought: I should search the emails from Alice about the invoice.\nAction: search_emails(invoice, alice, \"\", \"\")\nPAUSE"),
+            ("Action: search_emails(invoice, alice, , )",
+             "Thought: There is one.\nFinal Answer: Yes, Alice sent you the October invoice and asks you to confirm the amount."),
+        ]},
+        {"query": "Read me my 5 latest emails", "react": [
+            ("Read me my 5 latest emails", "Thought: I need to read the latest emails.\nAction: read_emails(5)\nPAUSE"),
+            ("Action: read_emails(5)", "Thought: I have them.\nFinal Answer: Your latest emails are newsletters and a note from Bob about the trip."),
+        ]},
+        {"query": "Who won the last Champions League final?", "react": [
+            ("Who won the last Champions League final?",
+             "Thought: I should search the internet.\nAction: internet_search(last Champions League final winner)\nPAUSE"),
+            ("Action: internet_search(last Champions League final winner)",
+             "Thought: The results answer it.\nFinal Answer: According to the search results, the last final was won on penalties."),
+        ]},
+        {"query": "What's the weather in Mar del Plata and do I have meetings this week?", "react": [
+            ("What's the weather in Mar del Plata and do I have meetings this week?",
+             "Thought: These are independent, I can do both at once.\nAction: get_weather(Mar del Plata)\n"
+             f"Action: find_event_in_range(meeting, {today}, {next_week})\nPAUSE"),
+            ("Action: get_weather(Mar del Plata)",
+             "Thought: I have both.\nFinal Answer: It is 14°C and windy in Mar del Plata, and you have two meetings this week."),
+        ]},
+        {"query": "Hi, how are you?", "react": [
+            ("Hi, how are you?", "Thought: This is a greeting, no action needed.\nFinal Answer: Hi! I'm doing well, how can I help you?"),
+        ]},
+    ]
+
+def seed_google(latency: float, today: date) -> Tuple[FakeGmailService, FakeCalendarService]:
+    gmail = FakeGmailService(latency=latency)
+    now = time.time()
+    for i in range(60):
+        gmail.add_message(f"Newsletter {i % 5} <news{i % 5}@example.com>", f"Weekly digest #{i}",
+                          "The most read stories of the week", date=now - (i + 2) * 3600)
+    gmail.add_message("Bob <bob@example.com>", "Trip", "Are we still on for the trip on Saturday?", date=now - 1800)
+    gmail.add_message("Alice <alice@example.com>", "Invoice for October", "Please confirm the amount of the invoice",
+                      date=now - 600)
+
+    calendar = FakeCalendarService(latency=latency)
+    tomorrow = today + timedelta(days=1)
+    calendar.add_event("Team standup", f"{tomorrow}T10:00:00", f"{tomorrow}T10:15:00")
+    calendar.add_event("Dentist", f"{tomorrow}T17:30:00", f"{tomorrow}T18:30:00", location="Av. Colón 1234")
+    for day in range(2, 7):
+        calendar.add_event("Project meeting" if day % 2 else "Gym", f"{today + timedelta(days=day)}T15:00:00",
+                           f"{today + timedelta(days=day)}T16:00:00")
+    return gmail, calendar
+
+def percentile(values: List[float], q: float) -> float:
+    # linear interpolation between the closest ranks
+    if not values:
+        return 0.0
+    values = sorted(values)
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def summarize(agent: str, concurrency: int, latencies: List[float], wall: float, llm_calls: int, tool_calls: int,
+              api_calls: int) -> Dict[str, Any]:
+    n = max(len(latencies), 1)
+    return {
+        "agent": agent,
+        "concurrency": concurrency,
+        "queries": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "llm_calls_per_query": round(llm_calls / n, 2),
+        "tool_calls_per_query": round(tool_calls / n, 2),
+        # requests that reached a fake api, lower than the tool calls when the caches answer
+        "api_calls_per_query": round(api_calls / n, 2),
+        "throughput_qps": round(len(latencies) / wall, 2) if wall else 0.0,
+    }
+
+def run_react(corpus: List[Dict[str, Any]], llm: FakeOpenAI, apis: List[Any], concurrency: int, rounds: int,
+              workdir: str) -> Dict[str, Any]:
+    # imported here, config reads the api urls from the environment set up by main
+    from agent import ReActAgent
+    from email_manager import EmailManager
+    from registry import build_tools
+    from telemetry import telemetry
+
+    agents = []
+    for i in range(concurrency):
+        # every worker has its own agent, an agent runs one query at a time
+        email_manager = EmailManager(os.path.join(workdir, f"drafts-{concurrency}-{i}.db"), legacy_folder=os.path.join(workdir, "none"))
+        agent = ReActAgent(build_tools(email_manager), email_manager=email_manager,
+                           log_dir=os.path.join(workdir, f"logs-{concurrency}-{i}"))
+        agent.warm_up()
+        agents.append(agent)
+
+    for server in [llm, *apis]:
+        server.requests_made = 0
+    telemetry.reset()
+
+    def worker(agent) -> List[float]:
+        latencies = []
+        for _ in range(rounds):
+            for item in corpus:
+                start = time.perf_counter()
+                agent.run(item["query"])
+                latencies.append(time.perf_counter() - start)
+        return latencies
+
+    # the agent prints every step, not what is being measured
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(worker, agents))
+        wall = time.perf_counter() - start
+
+    for agent in agents:
+        agent.log_writer.close()
+    tool_calls = sum(series["count"] for series in telemetry.snapshot()["histograms"] if series["name"] == "tool_seconds")
+    return summarize("react", concurrency, [latency for latencies in results for latency in latencies], wall,
+                     llm.requests_made, tool_calls, sum(api.requests_made for api in apis))
+
+def run_reddtriever(corpus: List[Dict[str, Any]], llm: FakeOpenAI, tavily: FakeTavily, concurrency: int,
+                    rounds: int) -> Dict[str, Any]:
+    # reddtriever's modules have the same names as ours (agent, config...), it runs in its own interpreter
+    llm.reset()
+    tavily.reset()
+    env = dict(os.environ, OPENAI_BASE_URL=f"{llm.url}/v1", OPENAI_API_KEY="fake")
+    process = subprocess.run(
+        [sys.executable, REDDTRIEVER_BENCHMARK, "--concurrency", str(concurrency), "--rounds", str(rounds), "--tavily-url", tavily.url],
+        input=json.dumps([item["query"] for item in corpus]), capture_output=True, text=True, env=env
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"reddtriever benchmark failed:\n{process.stderr}")
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    # the search is reddtriever's only tool
+    return summarize("reddtriever", concurrency, result["latencies"], result["wall"], llm.requests_made,
+                     tavily.requests_made, tavily.requests_made)
+
+def find_regressions(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    previous = {(result["agent"], result["concurrency"]): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get((result["agent"], result["concurrency"]))
+        if old is None:
+            continue
+        name = f"{result['agent']} x{result['concurrency']}"
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if result[metric] > old[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {old[metric]} -> {result[metric]}")
+        # the scripts are fixed, any extra call is a change in behaviour
+        for metric in ("llm_calls_per_query", "tool_calls_per_query", "api_calls_per_query"):
+            if result[metric] > old[metric]:
+                regressions.append(f"{name}: {metric} {old[metric]} -> {result[metric]}")
+        if result["throughput_qps"] < old["throughput_qps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput_qps {old['throughput_qps']} -> {result['throughput_qps']}")
+    return regressions
+
+def print_report(results: List[Dict[str, Any]]):
+    print(f"{'agent':<13}{'conc':<6}{'queries':<9}{'p50 ms':<9}{'p95 ms':<9}{'p99 ms':<9}{'llm/q':<7}{'tools/q':<9}{'api/q':<7}{'q/s':<7}")
+    for r in results:
+        print(f"{r['agent']:<13}{r['concurrency']:<6}{r['queries']:<9}{r['p50_ms']:<9}{r['p95_ms']:<9}{r['p99_ms']:<9}"
+              f"{r['llm_calls_per_query']:<7}{r['tool_calls_per_query']:<9}{r['api_calls_per_query']:<7}{r['throughput_qps']:<7}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end to end benchmark of both agents")
+    parser.add_argument("--agents", default="react,reddtriever", help="comma separated, react and/or reddtriever")
+    parser.add_argument("--concurrency", default="1,4", help="comma separated numbers of queries in flight")
+    parser.add_argument("--rounds", type=int, default=2, help="times each worker runs the whole corpus")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds to the first token")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="seconds between streamed words")
+    parser.add_argument("--search-latency", type=float, default=0.25)
+    parser.add_argument("--weather-latency", type=float, default=0.1)
+    parser.add_argument("--google-latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency varies by +- this fraction")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    today = date.today()
+    corpus = build_corpus(today)
+    tavily = FakeTavily(latency=args.search_latency, jitter=args.jitter, seed=args.seed)
+    weather = FakeOpenWeather({"Paris": ("scattered clouds", 18.5), "Mar del Plata": ("strong wind", 14.0)},
+                              latency=args.weather_latency, jitter=args.jitter, seed=args.seed)
+    os.environ["TAVILY_SEARCH_URL"] = f"{tavily.url}/search"
+    os.environ["OPENWEATHER_URL"] = f"{weather.url}/data/2.5/weather"
+    os.environ["OPENAI_API_KEY"] = "fake"
+    agents = args.agents.split(",")
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if "react" in agents:
+            from google_services import set_service
+            from mail_mirror import MailMirror, set_mail_mirror
+            gmail, calendar = seed_google(args.google_latency, today)
+            set_service("gmail", gmail)
+            set_service("calendar", calendar)
+            set_mail_mirror(MailMirror(gmail, path=os.path.join(workdir, "mail_mirror.db")))
+            llm = FakeOpenAI([rule for item in corpus for rule in item["react"]], token_delay=args.token_delay,
+                             latency=args.llm_latency, jitter=args.jitter, seed=args.seed)
+            os.environ["OPENAI_BASE_URL"] = f"{llm.url}/v1"
+            for level in levels:
+                results.append(run_react(corpus, llm, [tavily, weather, gmail, calendar], level, args.rounds, workdir))
+            llm.close()
+
+        if "reddtriever" in agents:
+            rules = [(f"Follow up question: {item['query']}", item["query"]) for item in corpus] + [("<context>", REDDTRIEVER_ANSWER)]
+            llm = FakeOpenAI(rules, default="not_needed", token_delay=args.token_delay, latency=args.llm_latency,
+                             jitter=args.jitter, seed=args.seed)
+            for level in levels:
+                results.append(run_reddtriever(corpus, llm, tavily, level, args.rounds))
+            llm.close()
+
+    tavily.close()
+    weather.close()
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print(f"- {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import bisect
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from googleapiclient.errors import HttpError
+from google_services import get_service
+
+def event_time(when: Dict[str, str]) -> float:
+    # all day events only have a date, they start at local midnight
+    if 'dateTime' in when:
+        return datetime.fromisoformat(when['dateTime'].replace('Z', '+00:00')).timestamp()
+    return datetime.fromisoformat(when['date']).timestamp()
+
+class CalendarCache:
+    # every event of the calendar in memory, sorted by start time and kept up to date with sync tokens
+    def __init__(self, service, calendar_id: str = 'primary', sync_interval: float = 60):
+        self.service = service
+        self.calendar_id = calendar_id
+        # queries within sync_interval seconds of the last sync are answered without a round trip
+        self.sync_interval = sync_interval
+        self.last_sync = 0.0
+        self.sync_token: Optional[str] = None
+        self.events: Dict[str, Dict[str, Any]] = {}
+        # (start, end, id) sorted by start, plus the longest event so a range query knows how far back to look
+        self.index: List[Tuple[float, float, str]] = []
+        self.max_duration = 0.0
+        self._lock = threading.RLock()
+
+    def sync(self, force: bool = False):
+        with self._lock:
+            if not force and time.monotonic() - self.last_sync < self.sync_interval:
+                return
+            if self.sync_token is None:
+                self._full_sync()
+            else:
+                try:
+                    self._incremental_sync()
+                except HttpError as e:
+                    # 410 gone, the sync token expired and the calendar has to be listed again
+                    if e.resp.status != 410:
+                        raise
+                    self._full_sync()
+            self.last_sync = time.monotonic()
+
+    def _list(self, **params) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # the sync token only comes with the last page. time bounds, q and orderBy can't be
+        # combined with sync tokens, so the whole calendar is listed and filtered here
+        items = []
+        page_token = None
+        while True:
+            response = self.service.events().list(
+                calendarId=self.calendar_id,
+                singleEvents=True,
+                pageToken=page_token,
+                **params
+            ).execute()
+            items += response.get('items', [])
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return items, response.get('nextSyncToken')
+
+    def _full_sync(self):
+        items, sync_token = self._list(maxResults=2500)
+        self.events = {}
+        for event in items:
+            if event.get('status') != 'cancelled':
+                self.events[event['id']] = event
+        self._reindex()
+        self.sync_token = sync_token
+
+    def _incremental_sync(self):
+        items, sync_token = self._list(syncToken=self.sync_token)
+        for event in items:
+            if event.get('status') == 'cancelled':
+                self.events.pop(event['id'], None)
+            else:
+                self.events[event['id']] = event
+        if items:
+            self._reindex()
+        self.sync_token = sync_token
+
+    def _reindex(self):
+        self.index = []
+        for event_id, event in self.events.items():
+            try:
+                start, end = event_time(event['start']), event_time(event['end'])
+            except (KeyError, ValueError):
+                continue
+            self.index.append((start, end, event_id))
+        self.index.sort()
+        self.max_duration = max((end - start for start, end, _ in self.index), default=0.0)
+
+    # write through from the create, update and delete tools
+
+    def upsert(self, event: Dict[str, Any]):
+        with self._lock:
+            self.events[event['id']] = event
+            self._reindex()
+
+    def remove(self, event_id: str):
+        with self._lock:
+            if self.events.pop(event_id, None) is not None:
+                self._reindex()
+
+    def find(self, start: datetime, end: datetime, keywords: str = "") -> List[Dict[str, Any]]:
+        self.sync()
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        words = keywords.lower().split()
+        with self._lock:
+            # nothing that starts before start - max_duration can still be running at start
+            first = bisect.bisect_left(self.index, (start_ts - self.max_duration,))
+            last = bisect.bisect_left(self.index, (end_ts,))
+            found = []
+            for event_start, event_end, event_id in self.index[first:last]:
+                if event_end <= start_ts:
+                    continue
+                event = self.events[event_id]
+                text = " ".join(event.get(field, '') for field in ('summary', 'description', 'location')).lower()
+                if all(word in text for word in words):
+                    found.append(event)
+            return found
+
+_cache: Optional[CalendarCache] = None
+_cache_lock = threading.Lock()
+
+def get_calendar_cache() -> CalendarCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CalendarCache(get_service('calendar'))
+    return _cache
@@ -8,3 +8,48 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
 SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
+
+# api endpoints, overridden to point the tools at local stand-ins (see benchmark.py)
+TAVILY_SEARCH_URL = os.getenv("TAVILY_SEARCH_URL", "https://api.tavily.com/search")
+OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "https://api.openweathermap.org/data/2.5/weather")
+
+# opt-in on-disk cache of llm responses, strict turns a cache miss into an error (deterministic test runs)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+LLM_CACHE_STRICT = os.getenv("LLM_CACHE_STRICT", "false").lower() == "true"
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+# record every llm answer, tool result and clock read of the session to this jsonl file, replay it with replay.py
+RECORD_PATH = os.getenv("RECORD_PATH")
+
+# shared http session used by the tools
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "8"))
+# hosts with their own pool size, "https://api.tavily.com=4,https://api.openweathermap.org=2"
+HTTP_HOST_LIMITS = {
+    prefix.strip(): int(maxsize)
+    for prefix, maxsize in (entry.rsplit("=", 1) for entry in os.getenv("HTTP_HOST_LIMITS", "").split(",") if entry.strip())
+}
+
+# print how long each part of the startup took
+STARTUP_REPORT = os.getenv("STARTUP_REPORT", "false").lower() == "true"
+
+# whisper model, tiny, base, small, medium, large-v3... device and compute type "auto" use the gpu when
+# there is one (int8_float16) and int8 on the cpu, 0 threads lets ctranslate2 decide
+STT_MODEL = os.getenv("STT_MODEL", "large-v3")
+STT_DEVICE = os.getenv("STT_DEVICE", "auto")
+STT_COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", "auto")
+STT_CPU_THREADS = int(os.getenv("STT_CPU_THREADS", "0"))
+
+# transcribe while the push-to-talk button is held instead of after release
+STT_STREAMING = os.getenv("STT_STREAMING", "true").lower() == "true"
+STT_STREAM_STEP = float(os.getenv("STT_STREAM_STEP", "1.0"))
+# transcribe in a separate process that reads the audio from shared memory, an utterance can be this long at most
+STT_WORKER_PROCESS = os.getenv("STT_WORKER_PROCESS", "true").lower() == "true"
+STT_MAX_SECONDS = float(os.getenv("STT_MAX_SECONDS", "120"))
+# cut silence out of the audio before whisper decodes it
+STT_VAD = os.getenv("STT_VAD", "true").lower() == "true"
+
+# latency and token metrics, as a prometheus textfile rewritten after every query and/or served on
+# http://127.0.0.1:<port>/metrics (and /metrics.json)
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
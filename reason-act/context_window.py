@@ -0,0 +1,103 @@
+from typing import Callable, Dict, Iterator, List, Optional
+
+class TokenCounter:
+    def __init__(self, encoding: str = "o200k_base"):
+        self.encoding_name = encoding
+        self._encoding = None
+        self._loaded = False
+
+    @property
+    def encoding(self):
+        # loaded on first count, tiktoken is an optional dependency and slow to import
+        if not self._loaded:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except ImportError:
+                # without tiktoken, 4 characters per token is close enough for budgeting
+                self._encoding = None
+            self._loaded = True
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return (len(text) + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoding is not None:
+            head = self.encoding.decode(self.encoding.encode(text)[:max_tokens])
+        else:
+            head = text[:max_tokens * 4]
+        return head + "\n... [truncated]"
+
+class ContextWindow:
+    def __init__(self, token_budget: int = 3000, max_entry_tokens: int = 800,
+                 summarizer: Optional[Callable[[str, List[Dict[str, str]]], str]] = None):
+        self.token_budget = token_budget
+        self.max_entry_tokens = max_entry_tokens
+        # folds the evicted entries into the running summary, without it old turns are just dropped
+        self.summarizer = summarizer
+        self.counter = TokenCounter()
+        self.entries: List[Dict[str, str]] = []
+        self.entry_tokens: List[int] = []
+        self.summary = ""
+        self.summary_tokens = 0
+        self.dropped = 0
+        self.turn_start = 0
+
+    def start_turn(self):
+        # entries of the current query are evicted last, and the query itself never
+        self.turn_start = len(self.entries)
+
+    def append(self, entry: Dict[str, str]):
+        content = self.counter.truncate(entry["content"], self.max_entry_tokens)
+        self.entries.append({**entry, "content": content})
+        self.entry_tokens.append(self.counter.count(content))
+
+    def tokens(self) -> int:
+        return sum(self.entry_tokens) + self.summary_tokens
+
+    def compact(self):
+        if self.tokens() <= self.token_budget:
+            return
+
+        # evict down to 3/4 of the budget so the summarizer doesn't run on every step
+        target = self.token_budget * 3 // 4
+        evicted = []
+        while self.tokens() > target:
+            index = self._next_evictable()
+            if index is None:
+                break
+            evicted.append(self.entries.pop(index))
+            self.entry_tokens.pop(index)
+            if index < self.turn_start:
+                self.turn_start -= 1
+
+        if not evicted:
+            return
+        if self.summarizer is not None:
+            self.summary = self.summarizer(self.summary, evicted)
+            self.summary_tokens = self.counter.count(self.summary)
+        else:
+            self.dropped += len(evicted)
+
+    def _next_evictable(self) -> Optional[int]:
+        if self.turn_start > 0:
+            return 0
+        # only the current query is left, keep the question and drop its oldest steps
+        if len(self.entries) > 2:
+            return 1
+        return None
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        if self.summary:
+            yield {"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"}
+        elif self.dropped:
+            yield {"role": "system", "content": f"{self.dropped} earlier messages were dropped to save space."}
+        yield from self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
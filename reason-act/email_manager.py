@@ -1,80 +1,124 @@
 import os
 import json
+import re
+import sqlite3
+import threading
+import time
 
-# delete later 
 from colorama import Fore
 
-class EmailManager:
-    def __init__(self):
-        self.drafts_folder = 'reason-act/email_drafts'
-        self._ensure_drafts_folder_exists()
-        self.draft_counter = self._get_latest_draft_id()
+# draft field -> column
+DRAFT_FIELDS = {'to': 'recipient', 'subject': 'subject', 'body': 'body'}
 
-    def _ensure_drafts_folder_exists(self):
-        if not os.path.exists(self.drafts_folder):
-            os.makedirs(self.drafts_folder)
+class EmailManager:
+    def __init__(self, path: str = 'reason-act/email_drafts.db', legacy_folder: str = 'reason-act/email_drafts'):
+        # every draft in one sqlite file, ids come from the table so two writers can't get the same one
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS drafts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recipient TEXT,
+                subject TEXT,
+                body TEXT,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS drafts_updated_at ON drafts (updated_at);
+        """)
+        self.conn.commit()
+        self._migrate_json_drafts(legacy_folder)
 
-    def _get_latest_draft_id(self):
-        draft_files = [f for f in os.listdir(self.drafts_folder) if f.endswith('.json')]
-        if not draft_files:
-            return 0
-        return max([int(f.split('_')[1].split('.')[0]) for f in draft_files]) + 1
+    def _migrate_json_drafts(self, folder: str):
+        # drafts from the old one-json-file-per-draft folder keep their ids, the folder is kept as a backup
+        if not os.path.isdir(folder):
+            return
+        rows = []
+        for name in os.listdir(folder):
+            match = re.fullmatch(r'draft_(\d+)\.json', name)
+            if not match:
+                continue
+            path = os.path.join(folder, name)
+            try:
+                with open(path, 'r') as f:
+                    draft = json.load(f)
+                rows.append((int(match.group(1)), draft.get('to', ''), draft.get('subject', ''),
+                             draft.get('body', ''), os.path.getmtime(path)))
+            except (OSError, ValueError, AttributeError) as e:
+                # a broken draft must not keep the agent from starting, it stays in the backup folder
+                print(Fore.RED + f"Skipped draft {path}: {e}")
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO drafts VALUES (?, ?, ?, ?, ?)", rows)
+        # a backup from an earlier migration is not overwritten
+        backup = folder + '.migrated'
+        suffix = 1
+        while os.path.exists(backup):
+            suffix += 1
+            backup = f"{folder}.migrated-{suffix}"
+        try:
+            os.rename(folder, backup)
+        except OSError as e:
+            # the drafts are in the store already, INSERT OR IGNORE makes the next migration a no-op
+            print(Fore.RED + f"Could not move {folder} to {backup}: {e}")
+        if rows:
+            print(Fore.WHITE + f"Migrated {len(rows)} drafts from {folder} to the draft store")
 
-    def _get_draft_path(self, draft_id):
-        return os.path.join(self.drafts_folder, f'draft_{draft_id}.json')
+    def _parse_id(self, draft_id: str) -> int | None:
+        # draft_3, or just 3 the way the model sometimes writes it
+        match = re.fullmatch(r'(?:draft_?)?(\d+)', str(draft_id).strip(), re.IGNORECASE)
+        return int(match.group(1)) if match else None
 
     def write_email(self, to: str, subject: str, body: str, draft_id: str | None = None):
-        if draft_id is None:
-            draft_id = f"draft_{self.draft_counter}"
-            self.draft_counter += 1
-        else:
-            draft_id = draft_id.strip()
-
-        draft_path = self._get_draft_path(draft_id.split('_')[1])
-        draft_content = {
-            'to': to,
-            'subject': subject,
-            'body': body
-        }
+        # an empty id is a new draft like null, an id that can't be parsed is an error and not a silent new draft
+        existing_id = None
+        if draft_id is not None and str(draft_id).strip():
+            existing_id = self._parse_id(draft_id)
+            if existing_id is None:
+                raise ValueError(f"Invalid draft ID: {draft_id}. Draft IDs look like draft_3, use null for a new draft.")
+        with self._lock, self.conn:
+            if existing_id is None:
+                cursor = self.conn.execute(
+                    "INSERT INTO drafts (recipient, subject, body, updated_at) VALUES (?, ?, ?, ?)",
+                    (to, subject, body, time.time())
+                )
+                return f"draft_{cursor.lastrowid}"
 
-        with open(draft_path, 'w') as f:
-            json.dump(draft_content, f, indent=2)
-
-        return draft_id
+            self.conn.execute(
+                "INSERT INTO drafts (id, recipient, subject, body, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET recipient = excluded.recipient, subject = excluded.subject, "
+                "body = excluded.body, updated_at = excluded.updated_at",
+                (existing_id, to, subject, body, time.time())
+            )
+            return f"draft_{existing_id}"
 
     def get_draft(self, draft_id: str):
-        draft_path = self._get_draft_path(draft_id.split('_')[1])
-        if os.path.exists(draft_path):
-            with open(draft_path, 'r') as f:
-                return json.load(f)
-        else:
-            return {}
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM drafts WHERE id = ?", (self._parse_id(draft_id),)).fetchone()
+        return self._to_draft(row) if row else {}
 
     def update_draft(self, draft_id: str, field: str, new_content: str):
-        draft_path = self._get_draft_path(draft_id.split('_')[1])
-        if os.path.exists(draft_path) and field in ['to', 'subject', 'body']:
-            with open(draft_path, 'r+') as f:
-                draft = json.load(f)
-                draft[field] = new_content
-                f.seek(0)
-                json.dump(draft, f, indent=2)
-                f.truncate()
-            return True
-        return False
+        if field not in DRAFT_FIELDS:
+            return False
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                f"UPDATE drafts SET {DRAFT_FIELDS[field]} = ?, updated_at = ? WHERE id = ?",
+                (new_content, time.time(), self._parse_id(draft_id))
+            )
+        return cursor.rowcount > 0
 
     def delete_draft(self, draft_id: str):
-        draft_path = self._get_draft_path(draft_id.split('_')[1])
-        if os.path.exists(draft_path):
-            os.remove(draft_path)
-            return True
-        return False
+        with self._lock, self.conn:
+            cursor = self.conn.execute("DELETE FROM drafts WHERE id = ?", (self._parse_id(draft_id),))
+        return cursor.rowcount > 0
 
     def list_drafts(self, amount: int) -> list[dict]:
-        draft_files = sorted([f for f in os.listdir(self.drafts_folder) if f.endswith('.json')])
-        drafts = []
-        for draft_file in draft_files[:amount]:
-            draft_id = draft_file.split('.')[0]
-            with open(os.path.join(self.drafts_folder, draft_file), 'r') as f:
-                draft_content = json.load(f)
-                drafts.append({"id": draft_id, **draft_content})
-        return drafts
+        # most recently written first
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM drafts ORDER BY updated_at DESC, id DESC LIMIT ?", (amount,)
+            ).fetchall()
+        return [{"id": f"draft_{row['id']}", **self._to_draft(row)} for row in rows]
+
+    def _to_draft(self, row: sqlite3.Row) -> dict:
+        return {'to': row['recipient'], 'subject': row['subject'], 'body': row['body']}
@@ -0,0 +1,210 @@
+import base64
+import itertools
+import time
+from email import message_from_bytes
+from datetime import datetime, timezone
+from email.utils import formatdate
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+# in-memory stand-ins for the google api clients, same call shapes as googleapiclient
+# (service.users().messages().get(...).execute()), so the tools and the local caches run offline
+
+class FakeHttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        # where googleapiclient's HttpError keeps it
+        self.resp = SimpleNamespace(status=status)
+
+class FakeRequest:
+    def __init__(self, fn: Callable[[], Any], service: Any):
+        self.fn = fn
+        self.service = service
+
+    def execute(self, http=None):
+        self.service.requests_made += 1
+        if self.service.latency:
+            time.sleep(self.service.latency)
+        return self.fn()
+
+class FakeBatch:
+    def __init__(self, callback: Callable, service: "FakeGmailService"):
+        self.callback = callback
+        self.service = service
+        self.requests = []
+
+    def add(self, request: FakeRequest, request_id: str):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None):
+        # the whole batch costs one round trip
+        self.service.requests_made += 1
+        if self.service.latency:
+            time.sleep(self.service.latency)
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.fn(), None)
+            except Exception as e:
+                self.callback(request_id, None, e)
+
+class FakeGmailService:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.mailbox: Dict[str, Dict[str, Any]] = {}
+        self.history_log: List[Dict[str, Any]] = []
+        self.history_id = 1000
+        self.requests_made = 0
+        # message id -> http status, gets of that message fail with it until it is removed
+        self.get_errors: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+
+    # mailbox setup
+
+    def add_message(self, sender: str, subject: str, snippet: str = "", date: Optional[float] = None,
+                    labels: Optional[List[str]] = None) -> str:
+        message_id = f"m{next(self._ids):06d}"
+        date = date or time.time()
+        self.mailbox[message_id] = {
+            "id": message_id,
+            "threadId": message_id,
+            "labelIds": labels or ["INBOX"],
+            "snippet": snippet,
+            "internalDate": str(int(date * 1000)),
+            "payload": {"headers": [
+                {"name": "From", "value": sender},
+                {"name": "Subject", "value": subject},
+                {"name": "Date", "value": formatdate(date)},
+            ]},
+        }
+        self._record("messagesAdded", message_id)
+        return message_id
+
+    def delete_message(self, message_id: str):
+        self.mailbox.pop(message_id)
+        self._record("messagesDeleted", message_id)
+
+    def _record(self, kind: str, message_id: str):
+        self.history_id += 1
+        self.history_log.append({"id": str(self.history_id), kind: [{"message": {"id": message_id, "threadId": message_id}}]})
+
+    # api surface
+
+    def users(self):
+        return self
+
+    def new_batch_http_request(self, callback: Callable):
+        return FakeBatch(callback, self)
+
+    def _request(self, fn: Callable[[], Any]) -> FakeRequest:
+        return FakeRequest(fn, self)
+
+    def getProfile(self, userId: str):
+        return self._request(lambda: {"emailAddress": "me@example.com", "historyId": str(self.history_id)})
+
+    def history(self):
+        return _FakeHistory(self)
+
+    def messages(self):
+        return _FakeMessages(self)
+
+class _FakeHistory:
+    def __init__(self, gmail: FakeGmailService):
+        self.gmail = gmail
+
+    def list(self, userId: str, startHistoryId: str, pageToken: Optional[str] = None, **kwargs):
+        def run():
+            records = [record for record in self.gmail.history_log if int(record["id"]) > int(startHistoryId)]
+            return {"history": records, "historyId": str(self.gmail.history_id)}
+        return self.gmail._request(run)
+
+class _FakeMessages:
+    def __init__(self, gmail: FakeGmailService):
+        self.gmail = gmail
+
+    def list(self, userId: str, labelIds: Optional[List[str]] = None, maxResults: int = 100, pageToken: Optional[str] = None, **kwargs):
+        def run():
+            messages = sorted(self.gmail.mailbox.values(), key=lambda m: int(m["internalDate"]), reverse=True)
+            if labelIds:
+                messages = [m for m in messages if set(labelIds) <= set(m["labelIds"])]
+            start = int(pageToken or 0)
+            page = messages[start:start + maxResults]
+            response = {"messages": [{"id": m["id"], "threadId": m["threadId"]} for m in page]}
+            if start + maxResults < len(messages):
+                response["nextPageToken"] = str(start + maxResults)
+            return response
+        return self.gmail._request(run)
+
+    def get(self, userId: str, id: str, **kwargs):
+        def run():
+            if id in self.gmail.get_errors:
+                raise FakeHttpError(self.gmail.get_errors[id], f"Message {id} failed")
+            if id not in self.gmail.mailbox:
+                raise FakeHttpError(404, f"Message {id} not found")
+            return self.gmail.mailbox[id]
+        return self.gmail._request(run)
+
+    def send(self, userId: str, body: Dict[str, Any]):
+        def run():
+            mime = message_from_bytes(base64.urlsafe_b64decode(body["raw"]))
+            message_id = self.gmail.add_message("me@example.com", mime["subject"], mime.get_payload()[:100], labels=["SENT"])
+            return {"id": message_id, "labelIds": ["SENT"]}
+        return self.gmail._request(run)
+
+class FakeCalendarService:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calendar: Dict[str, Dict[str, Any]] = {}
+        # (sequence, event id) of every change, a sync token is the last sequence the client saw
+        self.changes: List[tuple] = []
+        self.requests_made = 0
+        self._ids = itertools.count(1)
+
+    def add_event(self, summary: str, start: str, end: str, **fields) -> Dict[str, Any]:
+        # start and end are iso datetimes, or plain dates for all day events
+        key = 'date' if len(start) == 10 else 'dateTime'
+        event = {"id": self._new_id(), "status": "confirmed", "summary": summary,
+                 "start": {key: start}, "end": {key: end}, **fields}
+        return self._save(event)
+
+    def _new_id(self) -> str:
+        return f"e{next(self._ids):06d}"
+
+    def _save(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        event["updated"] = datetime.now(timezone.utc).isoformat()
+        event.setdefault("htmlLink", f"https://calendar.google.com/calendar/event?eid={event['id']}")
+        self.calendar[event["id"]] = event
+        self.changes.append((len(self.changes) + 1, event["id"]))
+        return event
+
+    def _request(self, fn: Callable[[], Any]) -> FakeRequest:
+        return FakeRequest(fn, self)
+
+    def events(self):
+        return _FakeEvents(self)
+
+class _FakeEvents:
+    def __init__(self, calendar: FakeCalendarService):
+        self.calendar = calendar
+
+    def list(self, calendarId: str, syncToken: Optional[str] = None, **kwargs):
+        def run():
+            if syncToken is None:
+                items = [event for event in self.calendar.calendar.values() if event["status"] != "cancelled"]
+            else:
+                changed = dict.fromkeys(event_id for sequence, event_id in self.calendar.changes if sequence > int(syncToken))
+                items = [self.calendar.calendar[event_id] for event_id in changed]
+            return {"items": items, "nextSyncToken": str(len(self.calendar.changes))}
+        return self.calendar._request(run)
+
+    def insert(self, calendarId: str, body: Dict[str, Any]):
+        return self.calendar._request(lambda: self.calendar._save({**body, "id": self.calendar._new_id(), "status": "confirmed"}))
+
+    def update(self, calendarId: str, eventId: str, body: Dict[str, Any]):
+        return self.calendar._request(lambda: self.calendar._save({**body, "id": eventId, "status": "confirmed"}))
+
+    def delete(self, calendarId: str, eventId: str):
+        def run():
+            self.calendar._save({**self.calendar.calendar[eventId], "status": "cancelled"})
+            return ""
+        return self.calendar._request(run)
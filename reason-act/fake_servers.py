@@ -0,0 +1,199 @@
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# local http stand-ins for the openai, tavily and openweather apis, with a configurable latency and scripted
+# responses. the real clients talk to them over http, so connection handling and parsing are part of what's measured
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients hang up on keep-alive connections, e.g. the agent closing a stream early, that's not an error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class FakeServer:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        # every response waits latency seconds, +- jitter as a fraction of it
+        self.latency = latency
+        self.jitter = jitter
+        self.requests_made = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = _Server(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, name=type(self).__name__, daemon=True).start()
+
+    def _handler(self) -> type:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive, like the real apis
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                fake._count()
+                fake.handle_get(self)
+
+            def do_POST(self):
+                fake._count()
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                fake.handle_post(self, json.loads(body or b"{}"))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _count(self):
+        with self._lock:
+            self.requests_made += 1
+
+    def wait(self):
+        with self._lock:
+            delay = self.latency * (1 + self._random.uniform(-self.jitter, self.jitter))
+        if delay > 0:
+            time.sleep(delay)
+
+    def send_json(self, handler: BaseHTTPRequestHandler, data: Any, status: int = 200):
+        body = json.dumps(data).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def handle_get(self, handler: BaseHTTPRequestHandler):
+        handler.send_error(404)
+
+    def handle_post(self, handler: BaseHTTPRequestHandler, data: Dict[str, Any]):
+        handler.send_error(404)
+
+    def reset(self):
+        with self._lock:
+            self.requests_made = 0
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class FakeOpenAI(FakeServer):
+    # POST /v1/chat/completions, plain or streamed as server-sent events. the reply is the one of the first rule whose
+    # trigger is in the last message, default otherwise. latency is the time to the first token, then every
+    # chunk (a word) takes token_delay
+    def __init__(self, rules: Optional[List[Tuple[str, str]]] = None, default: str = "Final Answer: I don't know.",
+                 token_delay: float = 0.0, **kwargs: Any):
+        self.rules = rules or []
+        self.default = default
+        self.token_delay = token_delay
+        self.streams_cancelled = 0
+        super().__init__(**kwargs)
+
+    def reply(self, messages: List[Dict[str, str]]) -> str:
+        last = messages[-1]["content"] if messages else ""
+        return next((reply for trigger, reply in self.rules if trigger in last), self.default)
+
+    def handle_post(self, handler: BaseHTTPRequestHandler, data: Dict[str, Any]):
+        if not handler.path.rstrip("/").endswith("/chat/completions"):
+            handler.send_error(404)
+            return
+        content = self.reply(data.get("messages", []))
+        prompt_tokens = sum(len(message["content"].split()) + 4 for message in data.get("messages", []))
+        self.wait()
+        if data.get("stream"):
+            self._stream(handler, data.get("model", ""), content)
+            return
+        self.send_json(handler, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": data.get("model", ""),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content.split()),
+                      "total_tokens": prompt_tokens + len(content.split())},
+        })
+
+    def _stream(self, handler: BaseHTTPRequestHandler, model: str, content: str):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        created = int(time.time())
+
+        def event(delta: Dict[str, str], finish_reason: Optional[str] = None) -> str:
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        def send(text: str):
+            data = text.encode()
+            handler.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            handler.wfile.flush()
+
+        try:
+            send(event({"role": "assistant", "content": ""}))
+            for i, word in enumerate(re.findall(r"\s*\S+\s*", content)):
+                if i and self.token_delay:
+                    time.sleep(self.token_delay)
+                send(event({"content": word}))
+            send(event({}, "stop"))
+            send("data: [DONE]\n\n")
+            handler.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # the agent closes the stream as soon as it has a full action
+            with self._lock:
+                self.streams_cancelled += 1
+            handler.close_connection = True
+
+class FakeTavily(FakeServer):
+    # POST /search, scripted results for a query or n_results generated ones that mention it
+    def __init__(self, results: Optional[Dict[str, List[Dict[str, str]]]] = None, n_results: int = 5,
+                 content_size: int = 400, **kwargs: Any):
+        self.results = results or {}
+        self.n_results = n_results
+        self.content_size = content_size
+        super().__init__(**kwargs)
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        if query in self.results:
+            return self.results[query]
+        filler = f"Discussion about {query}. " * (self.content_size // (len(query) + 19) + 1)
+        return [
+            {"title": f"{query} ({i})", "url": f"https://www.reddit.com/r/fake/comments/{i}/", "content": filler[:self.content_size],
+             "score": round(1 - i / 10, 2)}
+            for i in range(1, self.n_results + 1)
+        ]
+
+    def handle_post(self, handler: BaseHTTPRequestHandler, data: Dict[str, Any]):
+        if handler.path.rstrip("/") != "/search":
+            handler.send_error(404)
+            return
+        query = data.get("query", "")
+        self.wait()
+        self.send_json(handler, {"query": query, "results": self.search(query), "images": [], "response_time": self.latency})
+
+class FakeOpenWeather(FakeServer):
+    # GET /data/2.5/weather?q=<city>, scripted (description, temperature) per city
+    def __init__(self, weather: Optional[Dict[str, Tuple[str, float]]] = None, default: Tuple[str, float] = ("scattered clouds", 18.5),
+                 **kwargs: Any):
+        self.weather = {city.lower(): value for city, value in (weather or {}).items()}
+        self.default = default
+        super().__init__(**kwargs)
+
+    def handle_get(self, handler: BaseHTTPRequestHandler):
+        url = urlparse(handler.path)
+        if url.path.rstrip("/") != "/data/2.5/weather":
+            handler.send_error(404)
+            return
+        city = parse_qs(url.query).get("q", [""])[0]
+        description, temp = self.weather.get(city.lower(), self.default)
+        self.wait()
+        self.send_json(handler, {"name": city, "weather": [{"main": description.title(), "description": description}],
+                                 "main": {"temp": temp}})
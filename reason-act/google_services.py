@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+import httplib2
+import google_auth_httplib2
+from google.auth.transport.requests import Request
+from google.auth.exceptions import RefreshError
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+from googleapiclient.discovery_cache.base import Cache
+from googleapiclient.errors import UnknownApiNameOrVersion
+from googleapiclient.http import HttpRequest
+from utils import AutoRefreshingCredentials
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)
+
+# api name -> (version, scopes, token file)
+GOOGLE_APIS = {
+    "calendar": ("v3", ["https://www.googleapis.com/auth/calendar"], "token.json"),
+    "gmail": ("v1", ["https://www.googleapis.com/auth/gmail.send", "https://www.googleapis.com/auth/gmail.readonly"], "token_gmail.json"),
+}
+
+_services: Dict[Tuple[str, str, Tuple[str, ...]], Any] = {}
+_credentials: Dict[str, Any] = {}
+_lock = threading.RLock()
+
+class DiscoveryFileCache(Cache):
+    def __init__(self, cache_dir: str = os.path.join(script_dir, ".discovery_cache"), max_age: int = 24 * 60 * 60):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        path = self._path(url)
+        if not os.path.exists(path) or time.time() - os.path.getmtime(path) > self.max_age:
+            return None
+        with open(path, "r") as f:
+            return f.read()
+
+    def set(self, url, content):
+        with open(self._path(url), "w") as f:
+            f.write(content)
+
+def get_service(api: str):
+    # built on first use and shared by every tool of the same api and scopes
+    version, scopes, token_file = GOOGLE_APIS[api]
+    key = (api, version, tuple(scopes))
+    if key not in _services:
+        with _lock:
+            if key not in _services:
+                creds = get_credentials(token_file, scopes)
+                _services[key] = _build_service(api, version, creds)
+    return _services[key]
+
+def set_service(api: str, service: Any):
+    # swaps in another client for an api, e.g. fake_google.FakeGmailService to run offline
+    version, scopes, _ = GOOGLE_APIS[api]
+    with _lock:
+        _services[(api, version, tuple(scopes))] = service
+
+def get_credentials(token_file: str, scopes: list[str]):
+    with _lock:
+        if token_file not in _credentials:
+            _credentials[token_file] = _load_credentials(token_file, scopes)
+        return _credentials[token_file]
+
+def _load_credentials(token_file: str, scopes: list[str]):
+    token_path = os.path.join(project_root, token_file)
+    credentials_path = os.path.join(project_root, 'credentials.json')
+
+    try:
+        if os.path.exists(token_path) and not _has_scopes(token_path, scopes):
+            # e.g. a gmail token from before gmail.readonly was added, refreshing it can't add the scope
+            print(f"{token_file} was not authorized for all of {', '.join(scopes)}. Re-authenticating...")
+            os.remove(token_path)
+        if os.path.exists(token_path):
+            creds = AutoRefreshingCredentials(token_path, scopes)
+            if creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+        else:
+            if not os.path.exists(credentials_path):
+                raise FileNotFoundError(f"credentials.json file not found at {credentials_path}")
+            flow = InstalledAppFlow.from_client_secrets_file(credentials_path, scopes)
+            creds = flow.run_local_server(port=0)
+
+            # Save the credentials for the next run
+            with open(token_path, 'w') as token:
+                token.write(creds.to_json())
+
+        return creds
+    except (RefreshError, ValueError) as e:
+        print(f"Error with token: {e}")
+        print("You may need to re-authenticate. Deleting the existing token and retrying...")
+        if os.path.exists(token_path):
+            os.remove(token_path)
+        return _load_credentials(token_file, scopes)  # Recursive call to retry authentication
+    except Exception as e:
+        print(f"An unexpected error occurred during authentication: {e}")
+        raise
+
+def _has_scopes(token_path: str, scopes: list[str]) -> bool:
+    # the scopes the token was granted, as saved by creds.to_json()
+    with open(token_path, 'r') as f:
+        granted = json.load(f).get('scopes') or []
+    if isinstance(granted, str):
+        granted = granted.split()
+    return set(scopes) <= set(granted)
+
+def _build_service(api: str, version: str, creds):
+    # httplib2 is not thread safe, every thread gets its own authorized http for the shared service
+    local = threading.local()
+
+    def request_builder(http, *args, **kwargs):
+        if not hasattr(local, "http"):
+            local.http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+        return HttpRequest(local.http, *args, **kwargs)
+
+    try:
+        # the discovery document bundled with the client, no network round trip
+        return build(api, version, credentials=creds, requestBuilder=request_builder, static_discovery=True)
+    except (TypeError, UnknownApiNameOrVersion):
+        # older client without bundled documents, fetch once and keep it on disk
+        return build(api, version, credentials=creds, requestBuilder=request_builder, cache=DiscoveryFileCache())
+
+def batch_get_messages(service, message_ids: List[str], headers: Tuple[str, ...] = ("Subject", "From", "Date"),
+                       batch_size: int = 50, return_exceptions: bool = False) -> List[Any]:
+    # one http round trip per batch of gets instead of one per message, only the headers we need.
+    # results keep the order of message_ids, a message that failed comes back as None, or as its exception
+    # with return_exceptions (a 404 is a deleted message, a 429 or 5xx is worth another try)
+    results: List[Any] = [None] * len(message_ids)
+    if not message_ids:
+        return results
+
+    def callback(request_id, response, exception):
+        if exception is None:
+            results[int(request_id)] = response
+        elif return_exceptions:
+            results[int(request_id)] = exception
+
+    def run_batch(offset: int):
+        batch = service.new_batch_http_request(callback=callback)
+        for i in range(offset, min(offset + batch_size, len(message_ids))):
+            batch.add(
+                service.users().messages().get(
+                    userId='me',
+                    id=message_ids[i],
+                    format='metadata',
+                    metadataHeaders=list(headers),
+                    fields='id,threadId,snippet,internalDate,labelIds,payload/headers'
+                ),
+                request_id=str(i)
+            )
+        batch.execute()
+
+    offsets = list(range(0, len(message_ids), batch_size))
+    if len(offsets) == 1:
+        run_batch(0)
+    else:
+        # more than one batch, send them at the same time
+        with ThreadPoolExecutor(max_workers=min(len(offsets), 4)) as pool:
+            list(pool.map(run_batch, offsets))
+    return results
+
+def message_header(message: Dict[str, Any], name: str, default: str = "") -> str:
+    return next((header['value'] for header in message.get('payload', {}).get('headers', []) if header['name'] == name), default)
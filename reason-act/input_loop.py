@@ -0,0 +1,88 @@
+import collections
+import os
+import selectors
+import signal
+import threading
+from typing import Any, Optional, Tuple
+
+class InputLoop:
+    # one place to wait for the next query: typed lines, voice transcripts and shutdown all wake the same select,
+    # nothing polls. other threads hand in events with put() and stop(), which write to a self-pipe
+    def __init__(self, *sources: Any):
+        self.selector = selectors.DefaultSelector()
+        self.pending = collections.deque()
+        self.stopped = False
+        self._lock = threading.Lock()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        self.selector.register(self._wakeup_read, selectors.EVENT_READ, None)
+        for source in sources:
+            self.add_source(source)
+
+    def add_source(self, source: Any, name: str = "stdin"):
+        # anything with a fileno() that delivers text lines, stdin or a pipe in a test
+        self.selector.register(source, selectors.EVENT_READ, {"name": name, "partial": b""})
+
+    def install_signal_handlers(self, signals=(signal.SIGTERM, signal.SIGHUP)):
+        for signum in signals:
+            signal.signal(signum, lambda *args: self.stop())
+
+    def put(self, text: str, source: str = "voice"):
+        with self._lock:
+            self.pending.append((source, text))
+        self._wake()
+
+    def stop(self):
+        self.stopped = True
+        self._wake()
+
+    def _wake(self):
+        try:
+            os.write(self._wakeup_write, b"\0")
+        except BlockingIOError:
+            # the pipe is full of wakeups already, one more changes nothing
+            pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, str]]:
+        # the next (source, text), None once stopped or when the timeout passes
+        while True:
+            with self._lock:
+                if self.pending:
+                    return self.pending.popleft()
+            if self.stopped:
+                return None
+            events = self.selector.select(timeout)
+            if not events:
+                return None
+            for key, _ in events:
+                if key.data is None:
+                    self._drain_wakeups()
+                else:
+                    self._read_lines(key)
+
+    def _drain_wakeups(self):
+        try:
+            while os.read(self._wakeup_read, 512):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _read_lines(self, key: selectors.SelectorKey):
+        # raw reads instead of readline, a buffered file would keep extra lines where select can't see them
+        data = os.read(key.fd, 4096)
+        if not data:
+            # end of input, e.g. ctrl-d or a closed pipe
+            self.selector.unregister(key.fileobj)
+            if key.data["partial"]:
+                self.put(key.data["partial"].decode(errors="replace"), key.data["name"])
+            self.stop()
+            return
+        *lines, key.data["partial"] = (key.data["partial"] + data).split(b"\n")
+        for line in lines:
+            self.put(line.decode(errors="replace").rstrip("\r"), key.data["name"])
+
+    def close(self):
+        self.selector.close()
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
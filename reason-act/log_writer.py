@@ -0,0 +1,10 @@
+import os
+import sys
+
+# the writer is shared with the other app, it lives in common/ at the repo root
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+from common.log_writer import LogWriter
+
+__all__ = ["LogWriter"]
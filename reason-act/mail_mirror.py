@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from googleapiclient.errors import HttpError
+from google_services import get_service, batch_get_messages, message_header
+
+class MailMirror:
+    # local copy of the mailbox metadata, kept up to date with gmail's history api
+    def __init__(self, service, path: str = "reason-act/mail_mirror.db", initial_sync_limit: int = 500, sync_interval: float = 60):
+        self.service = service
+        self.initial_sync_limit = initial_sync_limit
+        # reads within sync_interval seconds of the last sync don't touch the network at all
+        self.sync_interval = sync_interval
+        self.last_sync = 0.0
+        self._lock = threading.RLock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id TEXT PRIMARY KEY,
+                thread_id TEXT,
+                sender TEXT,
+                subject TEXT,
+                date TEXT,
+                internal_date INTEGER,
+                snippet TEXT,
+                labels TEXT
+            );
+            CREATE INDEX IF NOT EXISTS messages_internal_date ON messages (internal_date);
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(id UNINDEXED, sender, subject, snippet);
+            CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.conn.commit()
+
+    def sync(self, force: bool = False):
+        with self._lock:
+            if not force and time.monotonic() - self.last_sync < self.sync_interval:
+                return
+            history_id = self._get_state("history_id")
+            if history_id is None:
+                self._full_sync()
+            else:
+                try:
+                    self._incremental_sync(history_id)
+                except HttpError as e:
+                    # history ids expire after about a week, start over
+                    if e.resp.status != 404:
+                        raise
+                    self._full_sync()
+            self.last_sync = time.monotonic()
+
+    def _full_sync(self):
+        history_id = self.service.users().getProfile(userId='me').execute()['historyId']
+        message_ids = []
+        page_token = None
+        while len(message_ids) < self.initial_sync_limit:
+            response = self.service.users().messages().list(
+                userId='me',
+                maxResults=min(500, self.initial_sync_limit - len(message_ids)),
+                pageToken=page_token
+            ).execute()
+            message_ids += [message['id'] for message in response.get('messages', [])]
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+        fetched, _ = self._fetch(message_ids)
+        with self.conn:
+            self.conn.execute("DELETE FROM messages")
+            self.conn.execute("DELETE FROM messages_fts")
+            self._store(fetched)
+            self._set_state("history_id", str(history_id))
+
+    def _incremental_sync(self, history_id: str):
+        changed = set()
+        deleted = set()
+        page_token = None
+        latest_history_id = history_id
+        while True:
+            response = self.service.users().history().list(
+                userId='me',
+                startHistoryId=history_id,
+                pageToken=page_token
+            ).execute()
+            for record in response.get('history', []):
+                for key in ('messagesAdded', 'labelsAdded', 'labelsRemoved'):
+                    for change in record.get(key, []):
+                        changed.add(change['message']['id'])
+                for change in record.get('messagesDeleted', []):
+                    deleted.add(change['message']['id'])
+            latest_history_id = response.get('historyId', latest_history_id)
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+        changed -= deleted
+        fetched, missing = self._fetch(sorted(changed))
+        # a message that can't be found anymore was deleted after the change was recorded
+        deleted |= set(missing)
+
+        with self.conn:
+            self._delete(deleted)
+            self._store(fetched)
+            self._set_state("history_id", str(latest_history_id))
+
+    def _fetch(self, message_ids: List[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        # the messages, and the ids that are gone (404). any other failure raises before anything is stored, so the
+        # next sync starts again from the same history id instead of losing the message
+        fetched, missing = [], []
+        results = batch_get_messages(self.service, message_ids, return_exceptions=True)
+        for message_id, result in zip(message_ids, results):
+            if isinstance(result, Exception):
+                if getattr(getattr(result, 'resp', None), 'status', None) != 404:
+                    raise result
+                missing.append(message_id)
+            elif result is not None:
+                fetched.append(result)
+        return fetched, missing
+
+    def _store(self, messages: List[Dict[str, Any]]):
+        rows = []
+        for message in messages:
+            rows.append((
+                message['id'],
+                message.get('threadId'),
+                message_header(message, 'From', 'Unknown Sender'),
+                message_header(message, 'Subject', 'No Subject'),
+                message_header(message, 'Date'),
+                int(message.get('internalDate', 0)),
+                message.get('snippet', ''),
+                ",".join(message.get('labelIds', [])),
+            ))
+        self._delete([row[0] for row in rows])
+        self.conn.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.executemany(
+            "INSERT INTO messages_fts (id, sender, subject, snippet) VALUES (?, ?, ?, ?)",
+            [(row[0], row[2], row[3], row[6]) for row in rows]
+        )
+
+    def _delete(self, message_ids):
+        message_ids = [(message_id,) for message_id in message_ids]
+        self.conn.executemany("DELETE FROM messages WHERE id = ?", message_ids)
+        self.conn.executemany("DELETE FROM messages_fts WHERE id = ?", message_ids)
+
+    def search(self, keywords: str = "", sender: str = "", start_date: str = "", end_date: str = "",
+               label: str = "", limit: int = 10) -> List[Dict[str, Any]]:
+        self.sync()
+        query = "SELECT m.* FROM messages m"
+        conditions = []
+        params: List[Any] = []
+        if keywords.strip():
+            query += " JOIN messages_fts f ON f.id = m.id"
+            conditions.append("messages_fts MATCH ?")
+            # every word quoted, so user input can't break the fts syntax
+            params.append(" ".join('"' + word.replace('"', '""') + '"' for word in keywords.split()))
+        if sender.strip():
+            conditions.append("m.sender LIKE ?")
+            params.append(f"%{sender.strip()}%")
+        if start_date.strip():
+            conditions.append("m.internal_date >= ?")
+            params.append(self._to_millis(start_date))
+        if end_date.strip():
+            conditions.append("m.internal_date < ?")
+            params.append(self._to_millis(end_date, end_of_day=True))
+        if label:
+            conditions.append("(',' || m.labels || ',') LIKE ?")
+            params.append(f"%,{label},%")
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY m.internal_date DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(query, params).fetchall()]
+
+    def recent(self, limit: int = 10, label: str = "INBOX") -> List[Dict[str, Any]]:
+        return self.search(label=label, limit=limit)
+
+    def _to_millis(self, date: str, end_of_day: bool = False) -> int:
+        timestamp = datetime.fromisoformat(date.strip()).timestamp()
+        if end_of_day and len(date.strip()) == 10:
+            timestamp += 24 * 60 * 60
+        return int(timestamp * 1000)
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+_mirror: Optional[MailMirror] = None
+_mirror_lock = threading.Lock()
+
+def get_mail_mirror() -> MailMirror:
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = MailMirror(get_service('gmail'))
+    return _mirror
+
+def set_mail_mirror(mirror: MailMirror):
+    # e.g. a mirror of a fake_google service in a temporary file, so offline runs don't touch the real one
+    global _mirror
+    with _mirror_lock:
+        _mirror = mirror
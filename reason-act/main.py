@@ -1,92 +1,136 @@
-import time
-from agent import ReActAgent
-from tools import InternetSearch, GetWeather, PlayMusic, GoogleCalendarCreateEvent, GoogleCalendarUpdateEvent, \
-                  GoogleCalendarDeleteEvent, GoogleCalendarFindEventInRange, ReadEmails, WriteEmail, SendEmail, \
-                  DeleteEmail, GetDrafts, GetContactEmail
+from startup import startup_timer
 import json
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from colorama import init, Fore, Style
-from stt import initialize_whisper, initialize_audio, process_audio, audio_queue, toggle_listening
-from pynput import mouse
-import queue
+with startup_timer.section("import agent"):
+    from agent import ReActAgent
+with startup_timer.section("import tools"):
+    from registry import build_tools
+with startup_timer.section("import stt"):
+    from stt import initialize_whisper, initialize_audio, process_audio, audio_buffer, toggle_listening, StreamingTranscriber, \
+                    last_speech_stats, set_audio_buffer
+    from stt_worker import TranscriptionWorker
+with startup_timer.section("import pynput"):
+    from pynput import mouse
 from email_manager import EmailManager
+from input_loop import InputLoop
+from llm_cache import LLMCache
+from recording import Recording
+from config import LLM_CACHE_PATH, LLM_CACHE_STRICT, LLM_TEMPERATURE, RECORD_PATH, STARTUP_REPORT, STT_STREAMING, STT_STREAM_STEP, STT_VAD, \
+                   STT_WORKER_PROCESS, METRICS_TEXTFILE, METRICS_PORT
+from telemetry import telemetry
 
 init(autoreset=True)
 
 # Global variables
 stop_thread = False
 is_listening = False
-audio_queue = queue.Queue()
 
 def main():
-    email_manager = EmailManager()
-    tools = [
-        InternetSearch(),
-        GetWeather(),
-        PlayMusic(),
-        GoogleCalendarCreateEvent(),
-        GoogleCalendarUpdateEvent(),
-        GoogleCalendarDeleteEvent(),
-        GoogleCalendarFindEventInRange(),
-        ReadEmails(),
-        WriteEmail(email_manager),
-        SendEmail(email_manager),
-        DeleteEmail(email_manager),
-        GetDrafts(email_manager),
-        GetContactEmail()  
-    ]
+    with startup_timer.section("email manager"):
+        email_manager = EmailManager()
+    # only the tool metadata is needed for the prompt, each tool is built on its first call
+    tools = build_tools(email_manager)
     
-    agent = ReActAgent(tools, email_manager=email_manager)
+    llm_cache = LLMCache(LLM_CACHE_PATH, strict=LLM_CACHE_STRICT) if LLM_CACHE_PATH else None
+    recording = Recording(RECORD_PATH) if RECORD_PATH else None
+    agent = ReActAgent(tools, email_manager=email_manager, temperature=LLM_TEMPERATURE, llm_cache=llm_cache, recording=recording)
+    threading.Thread(target=agent.warm_up, daemon=True).start()
+    if METRICS_PORT:
+        telemetry.serve(METRICS_PORT)
     
-    global stop_thread, model
-    model = initialize_whisper()
-    p, stream = initialize_audio()
-    
-    # Create a queue to communicate between threads
-    query_queue = queue.Queue()
+    global stop_thread
+
+    # typed lines and voice transcripts both arrive here
+    input_loop = InputLoop(sys.stdin)
+    input_loop.install_signal_handlers()
+
+    def on_transcript(transcribed_text, speech_stats):
+        if speech_stats:
+            print(Fore.WHITE + f"({speech_stats['duration']:.1f}s of audio, {speech_stats['speech_ratio']:.0%} speech, "
+                               f"{speech_stats['silence_ratio']:.0%} silence)")
+        if transcribed_text:
+            input_loop.put(transcribed_text, "voice")
+        else:
+            print(Fore.RED + "No speech detected or audio level too low.")
+
+    worker = None
+    transcriber = None
+    if STT_WORKER_PROCESS:
+        # the model loads in the worker process while the prompt is already up
+        with startup_timer.section("transcription worker"):
+            worker = TranscriptionWorker(on_transcript, on_error=lambda error: print(Fore.RED + f"\n{error}"))
+    else:
+        def load_whisper():
+            with startup_timer.section("whisper model (background)"):
+                return initialize_whisper()
+
+        # the model loads while the prompt is already up, the first voice query waits for it if needed
+        model_future = ThreadPoolExecutor(max_workers=1).submit(load_whisper)
+        # waits for the model in its own thread if the button is pressed before it loaded
+        transcriber = StreamingTranscriber(model_future.result, step=STT_STREAM_STEP, vad=STT_VAD) if STT_STREAMING else None
+    with startup_timer.section("audio stream"):
+        p, stream = initialize_audio()
 
     def on_click_wrapper(x, y, button, pressed):
         if button == mouse.Button.button9:
             if pressed:
+                if worker:
+                    try:
+                        buffer = worker.start_utterance()
+                    except RuntimeError as e:
+                        print(Fore.RED + f"Voice input is not available: {e}")
+                        return
+                    if buffer is None:
+                        print(Fore.RED + "Still transcribing the previous queries, try again in a moment.")
+                        return
+                    set_audio_buffer(buffer)
+                else:
+                    audio_buffer.clear()
                 print(Fore.YELLOW + "Listening...")
-                audio_queue.queue.clear()
                 toggle_listening(True)
+                if transcriber:
+                    transcriber.start()
             else:
                 #print(Fore.YELLOW + "Stopped listening.")
                 toggle_listening(False)
-                transcribed_text = process_audio(model)
-                if transcribed_text:
-                    query_queue.put(transcribed_text)
+                if worker:
+                    # the transcript comes back through on_transcript, the listener is free right away
+                    worker.finish_utterance()
+                    return
+                if transcriber:
+                    transcribed_text = transcriber.finish()
                 else:
-                    print(Fore.RED + "No speech detected or audio level too low.")
-                    
+                    transcribed_text = process_audio(model_future.result(), vad=STT_VAD)
+                on_transcript(transcribed_text, dict(last_speech_stats))
+                last_speech_stats.clear()
+
     def get_user_input():
-        query = None
-        # Check if there's a transcribed query in the queue
-        if not query_queue.empty():
-            transcribed_query = query_queue.get()
-            print(Fore.WHITE + f"\n- {transcribed_query}")
-            return transcribed_query
-        else:
-            # If queue is empty, prompt for manual input
-            print(Fore.CYAN + "\nInput (or press the side button to speak): " + Fore.WHITE, end='', flush=True)
-            while not input_available() and query_queue.empty():
-                time.sleep(0.1)
-            if not query_queue.empty():
-                return get_user_input()  # Recursively call to process the voice input
-            query = input()
+        print(Fore.CYAN + "\nInput (or press the side button to speak): " + Fore.WHITE, end='', flush=True)
+        event = input_loop.get()
+        if event is None:
+            # stdin closed or a shutdown signal
+            return 'exit'
+        source, query = event
+        if source == "voice":
+            print(Fore.WHITE + f"\n- {query}")
         return query
 
-
     listener = mouse.Listener(on_click=on_click_wrapper)
     listener.start()
     
     os.system('clear')
-    print(Fore.CYAN + Style.BRIGHT + "\nHey there! What do you need?" + Style.RESET_ALL + " Type 'exit' to quit.")
+    print(Fore.CYAN + Style.BRIGHT + "\nHey there! What do you need?" + Style.RESET_ALL + " Type 'exit' to quit, start with '/plan ' to plan all the actions at once.")
     print(Fore.YELLOW + "\nAvailable tools:")
     for tool_info in agent.tool_info:
         print(Fore.GREEN + f"- {tool_info['name']}")#: " + Fore.WHITE + f"{tool_info['description']}")
     print("\n" + Fore.MAGENTA + "-"*150 + "\n")
+    if STARTUP_REPORT:
+        print(Fore.YELLOW + "Startup time:")
+        print(Fore.WHITE + startup_timer.report() + "\n")
     
     try:         
         while not stop_thread:
@@ -97,34 +141,47 @@ def main():
                     stop_thread = True
                     break
                 
+                mode = "react"
                 try:
-                    response = agent.run(query)
+                    if query.startswith('/plan '):
+                        query = query[len('/plan '):]
+                        mode = "plan"
+                        response = agent.run_plan(query)
+                    else:
+                        response = agent.run(query)
                     agent.save_interaction_log(query, response)
+                    if recording:
+                        recording.record_query(mode, query, response)
                 except Exception as e:
                     print(Fore.RED + f"An error occurred: {str(e)}")
+                    if recording:
+                        recording.record_query(mode, query, None, error=str(e))
+                if METRICS_TEXTFILE:
+                    telemetry.write_textfile(METRICS_TEXTFILE)
                 
                 print("\n" + Fore.MAGENTA + "-"*50 + "\n")
-            else:
-                # No query available, wait a bit before checking again
-                time.sleep(0.1)
 
     except KeyboardInterrupt:
         print("Stopping...")
         stop_thread = True
     finally:
         listener.stop()
+        # the audio callback writes into the worker's buffer, it has to stop before the worker goes
         stream.stop_stream()
         stream.close()
         p.terminate()
+        if worker:
+            worker.close()
+        input_loop.close()
+        agent.log_writer.close()
+        if recording:
+            recording.close()
         
     print(Fore.YELLOW + "\nFinal metrics:")
     print(Fore.WHITE + json.dumps(agent.metrics, indent=2))
-
-def input_available():
-    import select
-    import sys
-    return select.select([sys.stdin], [], [], 0.0)[0]
-
+    from transport import pool_stats
+    print(Fore.YELLOW + "\nHTTP pools:")
+    print(Fore.WHITE + json.dumps(pool_stats(), indent=2))
 
 if __name__ == "__main__":
     main()
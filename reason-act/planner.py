@@ -0,0 +1,130 @@
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, List
+from tools import Tool
+
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+class PlanError(Exception):
+    pass
+
+def parse_plan(text: str, tools: Dict[str, Tool]) -> List[Dict[str, Any]]:
+    # the model sometimes wraps the json in a markdown block
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+
+    try:
+        plan = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise PlanError(f"Plan is not valid JSON: {e}")
+
+    steps = plan.get("steps") if isinstance(plan, dict) else None
+    if not isinstance(steps, list):
+        raise PlanError("Plan must be an object with a 'steps' list.")
+
+    seen = set()
+    for step in steps:
+        if not isinstance(step, dict) or "id" not in step or "action" not in step:
+            raise PlanError(f"Every step needs an 'id' and an 'action', got: {step}")
+        step["id"] = str(step["id"])
+        if step["id"] in seen:
+            raise PlanError(f"Duplicated step id '{step['id']}'.")
+        seen.add(step["id"])
+        if step["action"] not in tools:
+            raise PlanError(f"Invalid action '{step['action']}'. Available actions are: {', '.join(tools.keys())}")
+        step.setdefault("input", "")
+        # placeholders are dependencies too, even if the model forgot to list them
+        referenced = set(PLACEHOLDER.findall(json.dumps(step["input"])))
+        step["depends_on"] = sorted(set(map(str, step.get("depends_on", []))) | referenced)
+
+    for step in steps:
+        missing = [dep for dep in step["depends_on"] if dep not in seen]
+        if missing:
+            raise PlanError(f"Step '{step['id']}' depends on unknown steps: {', '.join(missing)}")
+
+    return steps
+
+class PlanExecutor:
+    def __init__(self, tools: Dict[str, Tool], max_workers: int = 4):
+        self.tools = tools
+        self.max_workers = max_workers
+        # tools with side effects never run at the same time, even if the graph allows it
+        self._serial_lock = threading.Lock()
+
+    def execute(self, steps: List[Dict[str, Any]], on_start=None) -> Dict[str, str]:
+        results: Dict[str, str] = {}
+        values: Dict[str, str] = {}
+        failed = set()
+        pending = {step["id"]: step for step in steps}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for step_id, step in list(pending.items()):
+                    deps = step["depends_on"]
+                    if any(dep in failed for dep in deps):
+                        results[step_id] = f"Skipped: depends on failed step(s) {', '.join(d for d in deps if d in failed)}"
+                        failed.add(step_id)
+                        del pending[step_id]
+                    elif all(dep in values for dep in deps):
+                        action_input = self._render_input(step["input"], values)
+                        if on_start:
+                            on_start(step, action_input)
+                        running[pool.submit(self._run_step, step["action"], action_input)] = step
+                        del pending[step_id]
+
+                if not running:
+                    # nothing can make progress, the rest of the graph has a cycle
+                    for step_id in pending:
+                        results[step_id] = "Skipped: circular dependency in the plan"
+                        failed.add(step_id)
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    tool = self.tools[step["action"]]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        results[step["id"]] = f"Error: {e}"
+                        failed.add(step["id"])
+                        continue
+                    results[step["id"]] = result
+                    # tools return their errors, a step that failed that way must not feed its dependents either
+                    if tool.is_error(result):
+                        failed.add(step["id"])
+                        continue
+                    try:
+                        values[step["id"]] = tool.result_value(result)
+                    except ValueError:
+                        failed.add(step["id"])
+
+        return {step["id"]: results[step["id"]] for step in steps}
+
+    def _run_step(self, action: str, action_input: str) -> str:
+        tool = self.tools[action]
+        if tool.parallel_safe:
+            return tool.invoke(action_input)
+        with self._serial_lock:
+            return tool.invoke(action_input)
+
+    def _render_input(self, action_input: Any, values: Dict[str, str]) -> str:
+        rendered = self._substitute(action_input, values)
+        if isinstance(rendered, dict):
+            return json.dumps(rendered)
+        if isinstance(rendered, list):
+            return ", ".join(str(arg) for arg in rendered)
+        return str(rendered)
+
+    def _substitute(self, value: Any, values: Dict[str, str]) -> Any:
+        if isinstance(value, str):
+            return PLACEHOLDER.sub(lambda m: values[m.group(1)], value)
+        if isinstance(value, list):
+            return [self._substitute(item, values) for item in value]
+        if isinstance(value, dict):
+            return {key: self._substitute(item, values) for key, item in value.items()}
+        return value
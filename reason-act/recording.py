@@ -0,0 +1,163 @@
+import collections
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from llm_cache import LLMCache
+from tools import Tool
+from telemetry import telemetry
+
+class ReplayMismatch(Exception):
+    pass
+
+class Recording:
+    # every llm answer, tool result and clock read of a session, appended to a jsonl file as they happen. replayed,
+    # the agent runs for real but all of them come from the file, so the prompts are byte identical to the recorded ones.
+    # llm answers and clock reads are served in order, tool results by tool and input (parallel actions finish in any order).
+    # every run of the app appends a session to the file, a replay runs each session on a fresh agent
+    def __init__(self, path: str, replay: bool = False, strict: bool = True):
+        self.path = path
+        self.replay = replay
+        # strict raises when a prompt differs from the recorded one, otherwise it is only counted in mismatches
+        self.strict = strict
+        self.mismatches = 0
+        self._lock = threading.Lock()
+        self._file = None
+        if replay:
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+            self._write({"type": "session", "started": datetime.now().isoformat()})
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        # split at the session markers, whatever comes before the first one is a session too
+        sessions: List[List[Dict[str, Any]]] = [[]]
+        for event in events:
+            if event["type"] == "session":
+                sessions.append([])
+            else:
+                sessions[-1].append(event)
+        self.sessions = [session for session in sessions if session] or [[]]
+        self.select_session(0)
+
+    def select_session(self, index: int):
+        # the queries and recorded answers a replay serves from now on
+        events = self.sessions[index]
+        self.queries: List[Dict[str, Any]] = [event for event in events if event["type"] == "query"]
+        self._llm: Deque[Dict[str, Any]] = collections.deque(event for event in events if event["type"] == "llm")
+        self._clock: Deque[str] = collections.deque(event["time"] for event in events if event["type"] == "clock")
+        self._tools: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = collections.defaultdict(collections.deque)
+        for event in events:
+            if event["type"] == "tool":
+                self._tools[(event["name"], event["input"])].append(event)
+
+    def _write(self, event: Dict[str, Any]):
+        # written right away, a crash keeps everything up to the call that crashed
+        with self._lock:
+            self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def record_llm(self, site: str, params: Dict[str, Any], content: str):
+        self._write({"type": "llm", "site": site, "key": LLMCache.make_key(params), "content": content})
+
+    def replay_llm(self, site: str, params: Dict[str, Any]) -> str:
+        with self._lock:
+            if not self._llm:
+                raise ReplayMismatch(f"No recorded llm answer left for the {site} call")
+            event = self._llm.popleft()
+            mismatch = event["site"] != site or event["key"] != LLMCache.make_key(params)
+            if mismatch:
+                self.mismatches += 1
+        if mismatch and self.strict:
+            raise ReplayMismatch(f"The {site} prompt differs from the recorded {event['site']} prompt")
+        return event["content"]
+
+    def record_tool(self, name: str, input: Any, result: Optional[str] = None, error: Optional[str] = None):
+        event = {"type": "tool", "name": name, "input": str(input)}
+        if error is not None:
+            event["error"] = error
+        else:
+            event["result"] = result
+        self._write(event)
+
+    def replay_tool(self, name: str, input: Any) -> str:
+        with self._lock:
+            recorded = self._tools.get((name, str(input)))
+            if not recorded:
+                raise ReplayMismatch(f"No recorded result for {name}({input})")
+            event = recorded.popleft()
+        if "error" in event:
+            raise RuntimeError(event["error"])
+        return event["result"]
+
+    def now(self) -> datetime:
+        if self.replay:
+            with self._lock:
+                if not self._clock:
+                    raise ReplayMismatch("No recorded clock read left")
+                return datetime.fromisoformat(self._clock.popleft())
+        now = datetime.now()
+        self._write({"type": "clock", "time": now.isoformat()})
+        return now
+
+    def record_query(self, mode: str, query: str, answer: Optional[str], error: Optional[str] = None):
+        # after the calls it made, a replay runs the queries in this order
+        self._write({"type": "query", "mode": mode, "query": query, "answer": answer, "error": error})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class RecordedTool(Tool):
+    # stands in for a tool, its calls are recorded or, in a replay, answered from the recording without running the tool
+    def __init__(self, tool: Tool, recording: Recording):
+        self.tool = tool
+        self.recording = recording
+        self.name = tool.name
+        self.args = tool.args
+        self.description = tool.description
+        self.interactive = tool.interactive
+        self.parallel_safe = tool.parallel_safe
+        self.error_prefixes = tool.error_prefixes
+
+    @property
+    def cache(self):
+        return self.tool.cache
+
+    def __call__(self, input: Any) -> str:
+        return self.invoke(input)
+
+    def invoke(self, input: Any) -> str:
+        if self.recording.replay:
+            return self._replay(input)
+        try:
+            result = self.tool.invoke(input)
+        except Exception as e:
+            self.recording.record_tool(self.name, input, error=str(e))
+            raise
+        self.recording.record_tool(self.name, input, result)
+        return result
+
+    async def ainvoke(self, input: Any) -> str:
+        if self.recording.replay:
+            return self._replay(input)
+        try:
+            result = await self.tool.ainvoke(input)
+        except Exception as e:
+            self.recording.record_tool(self.name, input, error=str(e))
+            raise
+        self.recording.record_tool(self.name, input, result)
+        return result
+
+    def _replay(self, input: Any) -> str:
+        # still a tool span, so replayed runs report their tool calls like real ones
+        with telemetry.span("tool", tool=self.name, outcome="replayed"):
+            return self.recording.replay_tool(self.name, input)
+
+    def result_value(self, result: str) -> str:
+        return self.tool.result_value(result)
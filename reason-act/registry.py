@@ -0,0 +1,65 @@
+import threading
+from typing import Any, List
+from tools import Tool, InternetSearch, GetWeather, PlayMusic, GoogleCalendarCreateEvent, GoogleCalendarUpdateEvent, \
+                  GoogleCalendarDeleteEvent, GoogleCalendarFindEventInRange, ReadEmails, SearchEmails, WriteEmail, SendEmail, \
+                  DeleteEmail, GetDrafts, GetContactEmail
+from email_manager import EmailManager
+from startup import startup_timer
+
+class LazyTool(Tool):
+    # stands in for a tool with its class metadata, the real tool is built on the first call
+    def __init__(self, tool_class: type, *args: Any, **kwargs: Any):
+        self.tool_class = tool_class
+        self.name = tool_class.name
+        self.args = tool_class.args
+        self.description = tool_class.description
+        self.interactive = tool_class.interactive
+        self.parallel_safe = tool_class.parallel_safe
+        self.error_prefixes = tool_class.error_prefixes
+        self._tool_args = args
+        self._tool_kwargs = kwargs
+        self._tool = None
+        self._lock = threading.Lock()
+
+    @property
+    def tool(self) -> Tool:
+        if self._tool is None:
+            with self._lock:
+                if self._tool is None:
+                    with startup_timer.section(f"tool:{self.name}"):
+                        self._tool = self.tool_class(*self._tool_args, **self._tool_kwargs)
+        return self._tool
+
+    @property
+    def cache(self):
+        return self._tool.cache if self._tool is not None else None
+
+    def __call__(self, input: Any) -> str:
+        return self.tool(input)
+
+    def invoke(self, input: Any) -> str:
+        return self.tool.invoke(input)
+
+    async def ainvoke(self, input: Any) -> str:
+        return await self.tool.ainvoke(input)
+
+    def result_value(self, result: str) -> str:
+        return self.tool.result_value(result)
+
+def build_tools(email_manager: EmailManager) -> List[Tool]:
+    return [
+        LazyTool(InternetSearch),
+        LazyTool(GetWeather),
+        LazyTool(PlayMusic),
+        LazyTool(GoogleCalendarCreateEvent),
+        LazyTool(GoogleCalendarUpdateEvent),
+        LazyTool(GoogleCalendarDeleteEvent),
+        LazyTool(GoogleCalendarFindEventInRange),
+        LazyTool(ReadEmails),
+        LazyTool(SearchEmails),
+        LazyTool(WriteEmail, email_manager),
+        LazyTool(SendEmail, email_manager),
+        LazyTool(DeleteEmail, email_manager),
+        LazyTool(GetDrafts, email_manager),
+        LazyTool(GetContactEmail)
+    ]
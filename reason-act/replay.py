@@ -0,0 +1,105 @@
+import argparse
+import contextlib
+import cProfile
+import os
+import pstats
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+from agent import ReActAgent
+from email_manager import EmailManager
+from registry import build_tools
+from recording import Recording, ReplayMismatch
+from config import LLM_TEMPERATURE
+from telemetry import telemetry
+
+# re-runs a session recorded with RECORD_PATH=session.jsonl, offline. the agent's own code runs for real while the llm
+# answers, tool results and clock come from the recording, so what is timed is the agent's overhead: parsing, context
+# building and orchestration. every replay of a recording sees byte identical prompts and gives the same answers.
+# python reason-act/replay.py session.jsonl --repeat 20 --profile replay.prof
+
+def replay(path: str, strict: bool, workdir: str) -> tuple[List[Dict[str, Any]], int]:
+    recording = Recording(path, replay=True, strict=strict)
+    results = []
+    for index in range(len(recording.sessions)):
+        # every session was a fresh start of the app, with an empty conversation
+        recording.select_session(index)
+        results += replay_session(recording, os.path.join(workdir, f"session-{index}"))
+    return results, recording.mismatches
+
+def replay_session(recording: Recording, workdir: str) -> List[Dict[str, Any]]:
+    email_manager = EmailManager(os.path.join(workdir, "email_drafts.db"), legacy_folder=os.path.join(workdir, "email_drafts"))
+    agent = ReActAgent(build_tools(email_manager), email_manager=email_manager, temperature=LLM_TEMPERATURE,
+                       log_dir=os.path.join(workdir, "logs"), recording=recording)
+    results = []
+    try:
+        for recorded in recording.queries:
+            start = time.perf_counter()
+            answer, error = None, None
+            try:
+                if recorded["mode"] == "plan":
+                    answer = agent.run_plan(recorded["query"])
+                else:
+                    answer = agent.run(recorded["query"])
+            except ReplayMismatch as e:
+                # the run went somewhere the recording doesn't cover, the queries after this one can't line up
+                results.append({"query": recorded["query"], "seconds": time.perf_counter() - start, "identical": False,
+                                "diverged": str(e)})
+                break
+            except Exception as e:
+                error = str(e)
+            results.append({
+                "query": recorded["query"],
+                "seconds": time.perf_counter() - start,
+                "identical": answer == recorded["answer"] and error == recorded.get("error"),
+            })
+    finally:
+        agent.log_writer.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session offline")
+    parser.add_argument("recording", help="jsonl file written with RECORD_PATH")
+    parser.add_argument("--repeat", type=int, default=1, help="replay it this many times, for steadier timings")
+    parser.add_argument("--lenient", action="store_true", help="serve the recorded answers even when a prompt differs")
+    parser.add_argument("--profile", help="write cProfile stats to this file and print the top functions")
+    parser.add_argument("--verbose", action="store_true", help="show the agent's output")
+    args = parser.parse_args()
+
+    profiler = cProfile.Profile() if args.profile else None
+    passes = []
+    with tempfile.TemporaryDirectory() as workdir, contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        telemetry.reset()
+        for _ in range(args.repeat):
+            if profiler:
+                profiler.enable()
+            passes.append(replay(args.recording, not args.lenient, workdir))
+            if profiler:
+                profiler.disable()
+
+    results, mismatches = passes[0]
+    differing = [result for result in results if not result["identical"]]
+    print(f"{len(results)} queries replayed, {len(results) - len(differing)} answers identical to the recording, "
+          f"{mismatches} prompts differ")
+    for result in differing:
+        print(f"- {result['query']!r}: {result.get('diverged', 'different answer')}")
+
+    seconds = sorted(sum(result["seconds"] for result in results) for results, _ in passes)
+    print(f"\n{args.repeat} passes, {seconds[len(seconds) // 2] * 1000:.1f} ms median per pass, "
+          f"{seconds[0] * 1000:.1f} ms fastest")
+    for name in ("parse_seconds", "tool_seconds", "query_seconds"):
+        print(f"{name:<15}{telemetry.total(name) / args.repeat * 1000:.1f} ms per pass")
+
+    if profiler:
+        profiler.dump_stats(args.profile)
+        print()
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+
+    if differing or any(mismatches for _, mismatches in passes):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
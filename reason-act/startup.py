@@ -0,0 +1,27 @@
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+class StartupTimer:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.sections: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def section(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections.append((name, time.perf_counter() - start))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def report(self) -> str:
+        lines = [f"{name:<32} {duration * 1000:8.1f} ms" for name, duration in sorted(self.sections, key=lambda s: -s[1])]
+        lines.append(f"{'time to first prompt':<32} {self.elapsed() * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+# one timer for the process, started when main imports it
+startup_timer = StartupTimer()
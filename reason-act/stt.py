@@ -1,27 +1,80 @@
 import pyaudio
 import numpy as np
-from faster_whisper import WhisperModel
 import time
 from pynput import mouse
 import wave
 from datetime import datetime
-import queue
+import threading
 import os
+from config import STT_MODEL, STT_DEVICE, STT_COMPUTE_TYPE, STT_CPU_THREADS
+
+SAMPLE_RATE = 16000
+
+class AudioBuffer:
+    # float32 samples written straight into a preallocated array, whisper gets a view of it without copying.
+    # 4 bytes per sample, 64 KB per second of speech
+    def __init__(self, seconds: float = 30, sample_rate: int = SAMPLE_RATE):
+        self.data = np.zeros(int(seconds * sample_rate), dtype=np.float32)
+        self.length = 0
+        self._lock = threading.Lock()
+
+    def write(self, in_data: bytes):
+        samples = np.frombuffer(in_data, dtype=np.float32)
+        with self._lock:
+            end = self.length + len(samples)
+            if end > len(self.data):
+                # doubling keeps the copies amortized for long utterances, views handed out before still point at the old array
+                grown = np.zeros(max(end, 2 * len(self.data)), dtype=np.float32)
+                grown[:self.length] = self.data[:self.length]
+                self.data = grown
+            self.data[self.length:end] = samples
+            self.length = end
+
+    def view(self) -> np.ndarray:
+        with self._lock:
+            return self.data[:self.length]
+
+    def clear(self):
+        with self._lock:
+            self.length = 0
+
+    def __len__(self) -> int:
+        return self.length
 
 # Global variables
-audio_queue = queue.Queue()
+audio_buffer = AudioBuffer()
 is_listening = False
 stop_thread = False
 
-def initialize_whisper():
-    model_size = "large-v3"
-    return WhisperModel(model_size, device="cuda", compute_type="int8_float16")
+def resolve_device(device: str = STT_DEVICE, compute_type: str = STT_COMPUTE_TYPE) -> tuple[str, str]:
+    # auto picks the gpu when ctranslate2 sees one, int8 on cpu and int8_float16 on gpu
+    if device == "auto":
+        import ctranslate2
+        device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    if compute_type == "auto":
+        compute_type = "int8_float16" if device == "cuda" else "int8"
+    return device, compute_type
+
+def initialize_whisper(model_size: str = STT_MODEL, device: str = STT_DEVICE, compute_type: str = STT_COMPUTE_TYPE,
+                       cpu_threads: int = STT_CPU_THREADS):
+    # imported here, loading ctranslate2 takes a while and main does it in the background
+    from faster_whisper import WhisperModel
+
+    device, compute_type = resolve_device(device, compute_type)
+    try:
+        return WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+    except (RuntimeError, ValueError) as e:
+        if device == "cpu":
+            raise
+        # cuda listed but not usable (missing libraries, out of memory), fall back to the cpu
+        print(f"Could not load whisper on {device} ({e}), using the cpu")
+        return WhisperModel(model_size, device="cpu", compute_type="int8", cpu_threads=cpu_threads)
 
 def initialize_audio():
     p = pyaudio.PyAudio()
     stream = p.open(format=pyaudio.paFloat32,
                     channels=1,
-                    rate=16000,
+                    rate=SAMPLE_RATE,
                     input=True,
                     frames_per_buffer=1024,
                     stream_callback=audio_callback)
@@ -32,25 +85,89 @@ def audio_callback(in_data, frame_count, time_info, status):
     global is_listening
     if is_listening:
         # print("Audio callback called, is_listening:", is_listening)  # Debug print
-        audio_queue.put(in_data)
+        audio_buffer.write(in_data)
     return (None, pyaudio.paContinue)
 
-def process_audio(model):
+def detect_speech(audio_data: np.ndarray, frame_ms: int = 30, min_rms: float = 0.005, noise_factor: float = 3.0,
+                  padding_ms: int = 210, min_silence_ms: int = 300) -> list[tuple[int, int]]:
+    # energy based vad, returns the (start, end) sample ranges with speech in them.
+    # a frame is speech when its rms is well above the noise floor (the quietest 10% of frames)
+    frame = SAMPLE_RATE * frame_ms // 1000
+    n_frames = len(audio_data) // frame
+    if n_frames == 0:
+        return []
+    frames = audio_data[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    # capped so a recording that is speech from start to end doesn't raise the floor above its own speech
+    threshold = max(min_rms, min(noise_factor * np.percentile(rms, 10), 0.25 * rms.max()))
+    speech = rms > threshold
+
+    # pad the speech frames so soft word onsets and endings are kept
+    pad = padding_ms // frame_ms
+    if pad:
+        speech = np.convolve(speech, np.ones(2 * pad + 1), mode='same') > 0
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], speech.astype(np.int8), [0]))))
+
+    regions = []
+    for start, end in zip(edges[::2] * frame, edges[1::2] * frame):
+        # short pauses stay in, whisper uses them to place punctuation
+        if regions and start - regions[-1][1] < min_silence_ms * SAMPLE_RATE // 1000:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    if regions and regions[-1][1] == n_frames * frame:
+        regions[-1] = (regions[-1][0], len(audio_data))
+    return [(int(start), int(end)) for start, end in regions]
+
+def trim_silence(audio_data: np.ndarray) -> tuple[np.ndarray, list[tuple[int, int]]]:
+    # the audio with the non speech parts cut out, a view when there is only one speech range
+    regions = detect_speech(audio_data)
+    if len(regions) == 1:
+        return audio_data[regions[0][0]:regions[0][1]], regions
+    if not regions:
+        return audio_data[:0], regions
+    return np.concatenate([audio_data[start:end] for start, end in regions]), regions
+
+def trimmed_to_original(regions: list[tuple[int, int]], sample: int) -> int:
+    # maps a sample position in the trimmed audio back to the captured audio
+    for start, end in regions:
+        if sample <= end - start:
+            return start + sample
+        sample -= end - start
+    return regions[-1][1] if regions else 0
+
+def speech_stats(audio_data: np.ndarray, regions: list[tuple[int, int]]) -> dict:
+    speech = sum(end - start for start, end in regions)
+    total = max(len(audio_data), 1)
+    return {
+        "duration": len(audio_data) / SAMPLE_RATE,
+        "speech_ratio": speech / total,
+        "silence_ratio": 1 - speech / total,
+    }
+
+# speech and silence ratios of the last utterance
+last_speech_stats = {}
+
+def process_audio(model, vad: bool = True):
     global is_listening
     # print("Processing audio, is_listening:", is_listening)  # Debug print
-    buffer = []
-    while not audio_queue.empty():
-        buffer.extend(np.frombuffer(audio_queue.get(), dtype=np.float32))
+    audio_data = audio_buffer.view()
     
-    if buffer:
-        # print(f"Buffer size: {len(buffer)}")  # Debug print
-        audio_data = np.array(buffer)
+    if len(audio_data):
+        # print(f"Buffer size: {len(audio_data)}")  # Debug print
         #save_audio(audio_data)
         
         if np.max(np.abs(audio_data)) < 0.01:
             print("Warning: Very low audio levels detected. Check your microphone.")
             return ""
         else:
+            if vad:
+                # whisper's cost grows with the audio length, silence is cut before decoding
+                speech, regions = trim_silence(audio_data)
+                last_speech_stats.update(speech_stats(audio_data, regions))
+                if not regions:
+                    return ""
+                audio_data = speech
             segments, info = model.transcribe(audio_data, beam_size=5)
             full_text = " ".join(segment.text for segment in segments)
             return full_text
@@ -59,7 +176,98 @@ def process_audio(model):
     
     return ""
 
-def save_audio(audio_data, sample_rate=16000):
+class StreamingTranscriber:
+    # transcribes while the button is held. every step seconds the audio after the committed point is decoded,
+    # words that two passes in a row agree on are committed and the committed point moves past them,
+    # so at release only the tail after the last agreed word is left to decode
+    def __init__(self, load_model, buffer: AudioBuffer = None, step: float = 1.0, max_window: float = 15.0, beam_size: int = 5,
+                 vad: bool = True):
+        self.load_model = load_model
+        self.vad = vad
+        self.buffer = buffer if buffer is not None else audio_buffer
+        self.step = step
+        # an uncommitted window longer than this commits everything but its last word, agreement or not
+        self.max_window = max_window
+        self.beam_size = beam_size
+        self._stop = threading.Event()
+        self._thread = None
+        self._reset()
+
+    def _reset(self):
+        self.committed_words = []
+        self.committed_samples = 0
+        self.hypothesis = []
+
+    def start(self):
+        self._reset()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.step):
+            self._transcribe_pending(final=False)
+
+    def finish(self) -> str:
+        self._stop.set()
+        if self._thread is not None:
+            # an interim pass still running is finished, not thrown away
+            self._thread.join()
+            self._thread = None
+
+        audio_data = self.buffer.view()
+        if not len(audio_data):
+            print("No audio data in buffer")
+            return ""
+        if np.max(np.abs(audio_data)) < 0.01:
+            print("Warning: Very low audio levels detected. Check your microphone.")
+            return ""
+        if self.vad:
+            last_speech_stats.update(speech_stats(audio_data, detect_speech(audio_data)))
+        self._transcribe_pending(final=True)
+        return "".join(self.committed_words).strip()
+
+    def _transcribe_pending(self, final: bool):
+        audio_data = self.buffer.view()[self.committed_samples:]
+        if len(audio_data) < SAMPLE_RATE // 2 and not final:
+            return
+        regions = [(0, len(audio_data))]
+        if self.vad:
+            audio_data, regions = trim_silence(audio_data)
+        words = self._transcribe(audio_data)
+        if final:
+            self.committed_words += [word.word for word in words]
+            return
+
+        # stable prefix, the words this pass and the previous one agree on
+        stable = 0
+        while (stable < min(len(words), len(self.hypothesis))
+               and self._normalize(words[stable].word) == self._normalize(self.hypothesis[stable].word)):
+            stable += 1
+        if stable == 0 and len(audio_data) > self.max_window * SAMPLE_RATE:
+            stable = len(words) - 1
+
+        if stable > 0:
+            self.committed_words += [word.word for word in words[:stable]]
+            self.committed_samples += trimmed_to_original(regions, int(words[stable - 1].end * SAMPLE_RATE))
+        self.hypothesis = words[stable:]
+
+    def _transcribe(self, audio_data: np.ndarray) -> list:
+        if not len(audio_data):
+            return []
+        # the committed text goes in as the prompt, so the decoder keeps the context across the cut
+        segments, info = self.load_model().transcribe(
+            audio_data,
+            beam_size=self.beam_size,
+            word_timestamps=True,
+            initial_prompt="".join(self.committed_words)[-200:] or None
+        )
+        return [word for segment in segments for word in (segment.words or [])]
+
+    def _normalize(self, word: str) -> str:
+        return word.strip().lower().strip(".,!?")
+
+def save_audio(audio_data, sample_rate=SAMPLE_RATE):
     if not os.path.exists("saved_audio"):
         os.makedirs("saved_audio")
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -75,4 +283,10 @@ def save_audio(audio_data, sample_rate=16000):
 def toggle_listening(state):
     global is_listening
     is_listening = state
-    #print(f"Listening state toggled to: {is_listening}")  # Debug print
\ No newline at end of file
+    #print(f"Listening state toggled to: {is_listening}")  # Debug print
+
+
+def set_audio_buffer(buffer: AudioBuffer):
+    # where the callback writes from now on, e.g. a shared memory buffer read by the transcription worker
+    global audio_buffer
+    audio_buffer = buffer
@@ -0,0 +1,102 @@
+import argparse
+import itertools
+import os
+import time
+import wave
+import numpy as np
+from stt import SAMPLE_RATE, initialize_whisper, resolve_device, trim_silence
+
+# real time factor of each whisper configuration on some wav files, to pick the fastest model that is accurate enough.
+# python reason-act/stt_benchmark.py samples/*.wav --models tiny,base,small --devices cpu --threads 4,8
+# a transcript next to a wav (same name, .txt) adds the word error rate
+
+def load_wav(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16 bit wav files are supported")
+        audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32) / 32768
+        channels, rate = wf.getnchannels(), wf.getframerate()
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        # linear resampling is good enough for speech
+        positions = np.arange(0, len(audio), rate / SAMPLE_RATE)
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+def load_reference(path: str) -> str | None:
+    reference_path = os.path.splitext(path)[0] + ".txt"
+    if not os.path.exists(reference_path):
+        return None
+    with open(reference_path, "r") as f:
+        return f.read()
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    ref = [word.strip(".,!?").lower() for word in reference.split()]
+    hyp = [word.strip(".,!?").lower() for word in hypothesis.split()]
+    # edit distance over words, one row at a time
+    row = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (ref_word != hyp_word))
+    return row[-1] / max(len(ref), 1)
+
+def benchmark(model, samples, beam_size: int, vad: bool):
+    audio_seconds = 0.0
+    decode_seconds = 0.0
+    errors = []
+    for audio, reference in samples:
+        audio_seconds += len(audio) / SAMPLE_RATE
+        start = time.perf_counter()
+        if vad:
+            audio, _ = trim_silence(audio)
+        segments, info = model.transcribe(audio, beam_size=beam_size)
+        text = " ".join(segment.text for segment in segments)
+        decode_seconds += time.perf_counter() - start
+        if reference is not None:
+            errors.append(word_error_rate(reference, text))
+    return decode_seconds / audio_seconds, (sum(errors) / len(errors) if errors else None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Real time factor of whisper configurations")
+    parser.add_argument("wavs", nargs="+", help="wav files to transcribe")
+    parser.add_argument("--models", default="tiny,base,small", help="comma separated model sizes")
+    parser.add_argument("--devices", default="auto", help="comma separated, cpu, cuda or auto")
+    parser.add_argument("--compute-types", default="auto", help="comma separated, int8, int8_float16, float16, float32 or auto")
+    parser.add_argument("--threads", default="0", help="comma separated cpu thread counts, 0 lets ctranslate2 decide")
+    parser.add_argument("--beam-size", type=int, default=5)
+    parser.add_argument("--vad", action="store_true", help="trim silence before decoding, like the app does")
+    args = parser.parse_args()
+
+    samples = [(load_wav(path), load_reference(path)) for path in args.wavs]
+    total = sum(len(audio) for audio, _ in samples) / SAMPLE_RATE
+    print(f"{len(samples)} files, {total:.1f}s of audio\n")
+    print(f"{'model':<12}{'device':<8}{'compute':<15}{'threads':<9}{'load s':<9}{'rtf':<8}{'wer':<8}")
+
+    configs = itertools.product(args.models.split(","), args.devices.split(","), args.compute_types.split(","),
+                                [int(threads) for threads in args.threads.split(",")])
+    seen = set()
+    for model_size, device, compute_type, threads in configs:
+        device, compute_type = resolve_device(device, compute_type)
+        # thread count only matters on the cpu, and auto can resolve to a configuration already run
+        key = (model_size, device, compute_type, threads if device == "cpu" else 0)
+        if key in seen:
+            continue
+        seen.add(key)
+        try:
+            start = time.perf_counter()
+            model = initialize_whisper(model_size, device, compute_type, threads)
+            load_seconds = time.perf_counter() - start
+        except Exception as e:
+            print(f"{model_size:<12}{device:<8}{compute_type:<15}{threads:<9}failed: {e}")
+            continue
+        # one pass so the first call's setup isn't counted
+        list(model.transcribe(samples[0][0][:SAMPLE_RATE], beam_size=args.beam_size)[0])
+        rtf, wer = benchmark(model, samples, args.beam_size, args.vad)
+        wer_text = f"{wer:.1%}" if wer is not None else "-"
+        print(f"{model_size:<12}{device:<8}{compute_type:<15}{threads:<9}{load_seconds:<9.1f}{rtf:<8.3f}{wer_text:<8}")
+        del model
+
+if __name__ == "__main__":
+    main()
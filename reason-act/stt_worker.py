@@ -0,0 +1,175 @@
+import multiprocessing
+import queue
+import threading
+from multiprocessing import shared_memory
+from typing import Callable, Optional
+import numpy as np
+import stt
+from stt import AudioBuffer, StreamingTranscriber, SAMPLE_RATE, initialize_whisper, process_audio, last_speech_stats
+from config import STT_MAX_SECONDS, STT_STREAMING, STT_STREAM_STEP, STT_VAD
+
+class SharedAudioBuffer(AudioBuffer):
+    # fixed size, the samples live in shared memory so the worker process reads them where the callback wrote them.
+    # the length is a shared value, written after the samples so the reader never sees samples that aren't there yet
+    def __init__(self, length, seconds: float = STT_MAX_SECONDS, name: Optional[str] = None):
+        size = int(seconds * SAMPLE_RATE)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size * 4)
+        else:
+            try:
+                # only the creator unlinks it, the worker must not register it with its own resource tracker
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                self.shm = shared_memory.SharedMemory(name=name)
+        self.data = np.ndarray((size,), dtype=np.float32, buffer=self.shm.buf)
+        self.shared_length = length
+        self.full = False
+        self._lock = threading.Lock()
+
+    @property
+    def length(self) -> int:
+        return self.shared_length.value
+
+    @length.setter
+    def length(self, value: int):
+        self.shared_length.value = value
+
+    def write(self, in_data: bytes):
+        samples = np.frombuffer(in_data, dtype=np.float32)
+        with self._lock:
+            start = self.length
+            end = min(start + len(samples), len(self.data))
+            if end - start < len(samples) and not self.full:
+                self.full = True
+                print(f"Utterance longer than {len(self.data) // SAMPLE_RATE}s, the rest is not recorded")
+            self.data[start:end] = samples[:end - start]
+            self.length = end
+
+    def clear(self):
+        with self._lock:
+            self.length = 0
+            self.full = False
+
+    def close(self):
+        # the numpy view has to go before the shared memory can be closed
+        del self.data
+        self.shm.close()
+
+def _worker_main(slots, commands, results, seconds: float, streaming: bool, step: float, vad: bool):
+    buffers = [SharedAudioBuffer(length, seconds, name) for name, length, _ in slots]
+    try:
+        model = initialize_whisper()
+    except Exception as e:
+        # nothing can be transcribed, the parent reports it and stops handing out slots
+        results.put(("error", f"Could not load the whisper model: {e}", None))
+        model = None
+    transcriber = None
+    while model is not None:
+        command, slot = commands.get()
+        if command == "stop":
+            break
+        try:
+            if command == "start" and streaming:
+                transcriber = StreamingTranscriber(lambda: model, buffers[slot], step=step, vad=vad)
+                transcriber.start()
+            elif command == "finish":
+                if streaming and transcriber is not None:
+                    text = transcriber.finish()
+                    transcriber = None
+                else:
+                    stt.set_audio_buffer(buffers[slot])
+                    text = process_audio(model, vad=vad)
+                results.put(("transcript", text, dict(last_speech_stats)))
+        except Exception as e:
+            # this utterance is lost, the worker keeps serving the next ones
+            transcriber = None
+            results.put(("error", f"Transcription failed: {e}", None))
+        finally:
+            if command == "finish":
+                last_speech_stats.clear()
+                # the slot can be recorded into again
+                slots[slot][2].value = 0
+
+    for buffer in buffers:
+        buffer.close()
+    results.put(("stopped", None, None))
+
+class TranscriptionWorker:
+    # the whisper model lives in its own process, so decoding doesn't hold up the mouse listener or fight the agent
+    # for the gil. audio is captured into shared memory slots that are used in turn, so the next utterance can be
+    # recorded while the last one is still being transcribed
+    def __init__(self, on_transcript: Callable[[str, dict], None], seconds: float = STT_MAX_SECONDS, n_slots: int = 2,
+                 streaming: bool = STT_STREAMING, step: float = STT_STREAM_STEP, vad: bool = STT_VAD,
+                 on_error: Callable[[str], None] = print):
+        self.on_transcript = on_transcript
+        # failures of the worker, a lost utterance or the whole process gone
+        self.on_error = on_error
+        self.error: Optional[str] = None
+        # spawn, forking a process that already runs the audio and mouse threads is asking for trouble
+        ctx = multiprocessing.get_context("spawn")
+        self.buffers = [SharedAudioBuffer(ctx.Value('q', 0), seconds) for _ in range(n_slots)]
+        self.busy = [ctx.Value('b', 0) for _ in range(n_slots)]
+        slots = [(buffer.shm.name, buffer.shared_length, busy) for buffer, busy in zip(self.buffers, self.busy)]
+        self.commands = ctx.Queue()
+        self.results = ctx.Queue()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(slots, self.commands, self.results, seconds, streaming, step, vad),
+            daemon=True
+        )
+        self.process.start()
+        self.next_slot = 0
+        self.current_slot = None
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+
+    def start_utterance(self) -> Optional[SharedAudioBuffer]:
+        # the buffer to record into, None when every slot is still waiting for its transcript.
+        # raises once the worker process is gone, its slots would stay busy forever
+        if not self.process.is_alive():
+            raise RuntimeError(self.error or f"The transcription worker exited with code {self.process.exitcode}")
+        slot = self.next_slot
+        if self.busy[slot].value:
+            return None
+        self.busy[slot].value = 1
+        buffer = self.buffers[slot]
+        buffer.clear()
+        self.current_slot = slot
+        self.next_slot = (slot + 1) % len(self.buffers)
+        self.commands.put(("start", slot))
+        return buffer
+
+    def finish_utterance(self):
+        # returns right away, the transcript comes back through on_transcript
+        if self.current_slot is None:
+            return
+        self.commands.put(("finish", self.current_slot))
+        self.current_slot = None
+
+    def _read_results(self):
+        while True:
+            try:
+                kind, text, stats = self.results.get(timeout=1)
+            except queue.Empty:
+                if self.process.is_alive():
+                    continue
+                # killed without a word, e.g. out of memory
+                self.error = self.error or f"The transcription worker exited with code {self.process.exitcode}"
+                self.on_error(self.error)
+                break
+            if kind == "stopped":
+                break
+            if kind == "error":
+                self.error = text
+                self.on_error(text)
+            else:
+                self.on_transcript(text, stats)
+
+    def close(self):
+        self.commands.put(("stop", None))
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+        for buffer in self.buffers:
+            buffer.close()
+            buffer.shm.unlink()
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Tuple
+
+# seconds, from a cached tool call to a slow completion
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        # interpolated inside the bucket the quantile falls in, like prometheus' histogram_quantile
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if seen + count >= rank and count:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1]
+
+class Telemetry:
+    # counters and latency histograms for the whole process, with labels. spans time a block into a histogram
+    def __init__(self, namespace: str = "react"):
+        self.namespace = namespace
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    @contextmanager
+    def span(self, name: str, **labels: str) -> Iterator[Dict[str, str]]:
+        # the yielded dict can add labels from inside the block, e.g. the outcome of a call
+        start = time.perf_counter()
+        extra: Dict[str, str] = {}
+        try:
+            yield extra
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - start, **labels, **extra)
+
+    def total(self, name: str) -> float:
+        # sum over every label set, a counter's value or a histogram's total
+        with self._lock:
+            if name in self.counters:
+                return sum(self.counters[name].values())
+            return sum(hist.sum for hist in self.histograms.get(name, {}).values())
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for name, series in self.counters.items() for labels, value in series.items()
+                ],
+                "histograms": [
+                    {"name": name, "labels": dict(labels), "count": hist.count, "sum": round(hist.sum, 6),
+                     "p50": round(hist.quantile(0.5), 6), "p95": round(hist.quantile(0.95), 6), "p99": round(hist.quantile(0.99), 6)}
+                    for name, series in self.histograms.items() for labels, hist in series.items()
+                ],
+            }
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                metric = f"{self.namespace}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                for labels, value in series.items():
+                    lines.append(f"{metric}{self._format_labels(labels)} {value}")
+            for name, series in sorted(self.histograms.items()):
+                metric = f"{self.namespace}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, hist in series.items():
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets + (float("inf"),), hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{metric}_bucket{self._format_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{metric}_sum{self._format_labels(labels)} {hist.sum}")
+                    lines.append(f"{metric}_count{self._format_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def _format_labels(self, labels: Labels) -> str:
+        if not labels:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+    def write_textfile(self, path: str):
+        # for node_exporter's textfile collector, written to a temp file and renamed so it is never read half written
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        # /metrics in the prometheus text format, /metrics.json as json
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = telemetry.to_prometheus().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(telemetry.snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="telemetry-http", daemon=True).start()
+        return server
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+# one registry for the process, the agent and the tools record into it
+telemetry = Telemetry()
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from datetime import datetime
+import pytest
+from agent import ReActAgent
+from email_manager import EmailManager
+from tools import Tool
+
+@pytest.fixture
+def make_agent(tmp_path):
+    agents = []
+
+    def make(tools=(), **kwargs):
+        email_manager = EmailManager(str(tmp_path / "drafts.db"), legacy_folder=str(tmp_path / "drafts"))
+        agent = ReActAgent(list(tools), email_manager=email_manager, log_dir=str(tmp_path / "logs"), **kwargs)
+        agents.append(agent)
+        return agent
+
+    yield make
+    for agent in agents:
+        agent.log_writer.close()
+
+def test_system_prompt_follows_the_injected_clock(make_agent):
+    now = [datetime(2024, 5, 1, 9, 30, 5)]
+    agent = make_agent(clock=lambda: now[0])
+    prompt = agent.get_system_prompt()
+    assert prompt.startswith(agent.static_prompt)
+    assert "Today's date is 2024-05-01 - 09:30" in prompt
+    # same minute, same prompt, so the llm cache keeps hitting
+    now[0] = datetime(2024, 5, 1, 9, 30, 59)
+    assert agent.get_system_prompt() == prompt
+    now[0] = datetime(2024, 5, 1, 21, 0)
+    assert "Today's date is 2024-05-01 - 21:00" in agent.get_system_prompt()
+
+class LogTool(Tool):
+    def __init__(self, name, log, parallel_safe, delay=0.05):
+        super().__init__()
+        self.name = name
+        self.log = log
+        self.parallel_safe = parallel_safe
+        self.delay = delay
+
+    def __call__(self, input):
+        self.log.append(("start", input))
+        time.sleep(self.delay)
+        self.log.append(("end", input))
+        return f"done {input}"
+
+def ordering_tools(log):
+    return [LogTool("read", log, parallel_safe=True), LogTool("write", log, parallel_safe=False, delay=0.01)]
+
+def assert_side_effect_is_a_barrier(log):
+    position = {event: i for i, event in enumerate(log)}
+    # the reads written before the write finish first, the ones after it only start once it is done
+    assert position[("end", "r1")] < position[("start", "w")]
+    assert position[("end", "r2")] < position[("start", "w")]
+    assert position[("end", "w")] < position[("start", "r3")]
+    # the reads on each side of it still run together
+    assert position[("start", "r2")] < position[("end", "r1")]
+
+ORDERING_THOUGHT = "Thought: a\nAction: read(r1)\nAction: read(r2)\nAction: write(w)\nAction: read(r3)\nPAUSE"
+
+def test_side_effect_actions_are_barriers(make_agent):
+    log = []
+    agent = make_agent(ordering_tools(log))
+    observations = agent._execute_actions(agent._parse_actions(ORDERING_THOUGHT))
+    assert observations == [f"Action: {name}({input})\nResult: done {input}"
+                            for name, input in [("read", "r1"), ("read", "r2"), ("write", "w"), ("read", "r3")]]
+    assert_side_effect_is_a_barrier(log)
+
+def test_side_effect_actions_are_barriers_async(make_agent):
+    log = []
+    agent = make_agent(ordering_tools(log))
+    observations = asyncio.run(agent._aexecute_actions(agent._parse_actions(ORDERING_THOUGHT)))
+    assert observations[2] == "Action: write(w)\nResult: done w"
+    assert_side_effect_is_a_barrier(log)
+
+def test_actions_past_the_limit_are_reported(make_agent):
+    agent = make_agent(ordering_tools([]), max_parallel_actions=2)
+    assert "At most 2 actions run per step" in agent.static_prompt
+    actions = agent._parse_actions("Action: read(a)\nAction: read(b)\nAction: write(c)\nPAUSE")
+    assert actions[:2] == [("read", "a"), ("read", "b")]
+    assert actions[2][0] is None and actions[2][1].startswith("Skipped write(c)")
+    observations = agent._execute_actions(actions)
+    assert "Skipped write(c)" in observations[2]
+
+@pytest.mark.parametrize("text, end", [
+    ('search(a, b) rest', len('search(a, b)')),
+    ('search(f(x), "(") rest', len('search(f(x), "(")')),
+    ("search('it)s') rest", len("search('it)s')")),
+    ("search(what's up) rest", len("search(what's up)")),
+    ('search("a \\" )") rest', len('search("a \\" )")')),
+    ('search(f(x)', None),
+    ('search("unclosed)', None),
+])
+def test_find_closing_paren(make_agent, text, end):
+    assert make_agent()._find_closing_paren(text, len("search(")) == end
+
+@pytest.mark.parametrize("thought, cut", [
+    ("Thought: done\nFinal Answer: It's sunny", None),
+    ("Final Answer: It's sunny\nObservation: made up", "Final Answer: It's sunny"),
+    ("Thought: a\nAction: read(x", None),
+    # another action could follow, the next line decides
+    ("Thought: a\nAction: read(x)", None),
+    ("Thought: a\nAction: read(x)\nAct", None),
+    ("Thought: a\nAction: read(x)\nPAUSE", "Thought: a\nAction: read(x)"),
+    ("Thought: a\nAction: read(x)\nAction: write(y", None),
+    ("Thought: a\nAction: read(x)\nAction: write(y)\nPAUSE", "Thought: a\nAction: read(x)\nAction: write(y)"),
+])
+def test_find_thought_end(make_agent, thought, cut):
+    end = make_agent(ordering_tools([]))._find_thought_end(thought)
+    assert (thought[:end] if end is not None else None) == cut
+
+def test_find_thought_end_stops_at_the_action_limit(make_agent):
+    assert make_agent(max_parallel_actions=1)._find_thought_end("Action: read(x)") == len("Action: read(x)")
+    thought = "Action: read(a)\nAction: read(b)\nAction: read(c)"
+    assert make_agent(max_parallel_actions=2)._find_thought_end(thought) == len("Action: read(a)\nAction: read(b)")
+
+def test_parse_actions(make_agent):
+    agent = make_agent(ordering_tools([]))
+    assert agent._parse_actions('Thought: a\nAction: read(city=Paris, "2")\nAction: write(\'x, y\')\nPAUSE') == [
+        ("read", "Paris, 2"), ("write", "x, y")]
+    assert agent._parse_actions("Action: fly(to the moon)") == [
+        (None, "Invalid action 'fly'. Available actions are: read, write")]
+    assert agent._parse_actions("Thought: nothing to do") == [(None, "No valid action found in the thought.")]
@@ -0,0 +1,53 @@
+from datetime import datetime
+import pytest
+from calendar_cache import CalendarCache
+from fake_google import FakeCalendarService
+
+@pytest.fixture
+def calendar():
+    calendar = FakeCalendarService()
+    calendar.add_event("Standup", "2024-05-06T09:00:00", "2024-05-06T09:15:00", description="daily sync")
+    calendar.add_event("Conference", "2024-05-01", "2024-05-10", location="Berlin")
+    calendar.add_event("Dentist", "2024-05-07T15:00:00", "2024-05-07T16:00:00")
+    return calendar
+
+@pytest.fixture
+def cache(calendar):
+    return CalendarCache(calendar, sync_interval=0)
+
+def summaries(events):
+    return [event["summary"] for event in events]
+
+def test_find_returns_overlapping_events_by_start(cache):
+    # the conference started days before the range, it is still running
+    assert summaries(cache.find(datetime(2024, 5, 6), datetime(2024, 5, 7))) == ["Conference", "Standup"]
+    assert summaries(cache.find(datetime(2024, 5, 7, 15, 30), datetime(2024, 5, 7, 18))) == ["Conference", "Dentist"]
+    assert summaries(cache.find(datetime(2024, 5, 11), datetime(2024, 5, 12))) == []
+
+def test_find_bounds_are_half_open(cache):
+    # an event ending right at the start of the range, or starting at its end, is not in it
+    assert summaries(cache.find(datetime(2024, 5, 6, 9, 15), datetime(2024, 5, 7, 15))) == ["Conference"]
+
+def test_find_matches_every_keyword(cache):
+    start, end = datetime(2024, 5, 1), datetime(2024, 5, 31)
+    assert summaries(cache.find(start, end, "daily")) == ["Standup"]
+    assert summaries(cache.find(start, end, "BERLIN conference")) == ["Conference"]
+    assert summaries(cache.find(start, end, "daily berlin")) == []
+
+def test_find_sees_changes_after_a_sync(calendar, cache):
+    start, end = datetime(2024, 5, 7), datetime(2024, 5, 8)
+    assert summaries(cache.find(start, end)) == ["Conference", "Dentist"]
+    dentist = next(event for event in calendar.calendar.values() if event["summary"] == "Dentist")
+    calendar.events().delete(calendarId="primary", eventId=dentist["id"]).execute()
+    calendar.add_event("Review", "2024-05-07T10:00:00", "2024-05-07T11:00:00")
+    assert summaries(cache.find(start, end)) == ["Conference", "Review"]
+
+def test_write_through_is_visible_without_a_sync(calendar, cache):
+    cache.sync()
+    cache.sync_interval = 3600
+    cache.upsert({"id": "local", "summary": "Lunch", "start": {"dateTime": "2024-05-08T12:00:00"},
+                  "end": {"dateTime": "2024-05-08T13:00:00"}})
+    start, end = datetime(2024, 5, 8, 11), datetime(2024, 5, 8, 14)
+    assert summaries(cache.find(start, end)) == ["Conference", "Lunch"]
+    cache.remove("local")
+    assert summaries(cache.find(start, end)) == ["Conference"]
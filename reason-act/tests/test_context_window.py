@@ -0,0 +1,57 @@
+from context_window import ContextWindow, TokenCounter
+
+class WordCounter(TokenCounter):
+    # one token per word, so the budgets below are easy to follow
+    def count(self, text):
+        return len(text.split())
+
+def window(budget, summarizer=None):
+    window = ContextWindow(token_budget=budget, summarizer=summarizer)
+    window.counter = WordCounter()
+    return window
+
+def turn(window, query, *steps):
+    window.start_turn()
+    window.append({"role": "user", "content": query})
+    for step in steps:
+        window.append({"role": "system", "content": step})
+
+def contents(window):
+    return [entry["content"] for entry in window]
+
+def test_under_budget_nothing_changes():
+    w = window(100)
+    turn(w, "one two", "three four")
+    w.compact()
+    assert contents(w) == ["one two", "three four"]
+
+def test_older_turns_are_dropped_first():
+    w = window(12)
+    turn(w, "old question here", "old answer here")
+    turn(w, "new question", "new step one", "new step two")
+    w.compact()
+    # down to 3/4 of the budget, the current turn stays whole
+    assert contents(w) == ["2 earlier messages were dropped to save space.", "new question", "new step one", "new step two"]
+    assert w.turn_start == 0
+
+def test_current_turn_keeps_its_question():
+    w = window(8)
+    turn(w, "the question", "step one is long", "step two is long", "step three")
+    w.compact()
+    assert contents(w)[1:] == ["the question", "step three"]
+    assert w.dropped == 2
+
+def test_evicted_entries_go_to_the_summarizer():
+    calls = []
+
+    def summarizer(summary, evicted):
+        calls.append((summary, [entry["content"] for entry in evicted]))
+        return "talked about the weather"
+
+    w = window(9, summarizer)
+    turn(w, "weather in Paris today", "sunny and warm there")
+    turn(w, "and tomorrow", "rain")
+    w.compact()
+    assert calls == [("", ["weather in Paris today", "sunny and warm there"])]
+    assert contents(w) == ["Summary of the earlier conversation: talked about the weather", "and tomorrow", "rain"]
+    assert w.tokens() == 3 + 4
@@ -0,0 +1,44 @@
+import json
+import pytest
+from email_manager import EmailManager
+
+@pytest.fixture
+def manager(tmp_path):
+    return EmailManager(str(tmp_path / "drafts.db"), legacy_folder=str(tmp_path / "drafts"))
+
+def test_edit_accepts_bare_and_prefixed_ids(manager):
+    draft_id = manager.write_email("a@example.com", "Hi", "first")
+    number = draft_id.split("_")[1]
+    assert manager.write_email("a@example.com", "Hi", "second", number) == draft_id
+    assert manager.write_email("a@example.com", "Hi", "third", f" Draft_{number} ") == draft_id
+    assert manager.get_draft(number)["body"] == "third"
+    assert len(manager.list_drafts(10)) == 1
+
+def test_unparseable_id_is_an_error_not_a_new_draft(manager):
+    manager.write_email("a@example.com", "Hi", "first")
+    with pytest.raises(ValueError, match="Invalid draft ID: the last one"):
+        manager.write_email("a@example.com", "Hi", "second", "the last one")
+    assert len(manager.list_drafts(10)) == 1
+    # empty means new, like null
+    manager.write_email("a@example.com", "Hi", "second", "")
+    assert len(manager.list_drafts(10)) == 2
+
+def write_legacy(folder, files):
+    folder.mkdir()
+    for name, content in files.items():
+        (folder / name).write_text(content)
+
+def test_migration_skips_broken_files_and_keeps_old_backups(tmp_path):
+    folder = tmp_path / "drafts"
+    (tmp_path / "drafts.migrated").mkdir()
+    write_legacy(folder, {
+        "draft_4.json": json.dumps({"to": "a@example.com", "subject": "Old", "body": "kept"}),
+        "draft_5.json": "{not json",
+        "draft_6.json": "[]",
+        "draft_x.json": "{}",
+        "notes.txt": "",
+    })
+    manager = EmailManager(str(tmp_path / "drafts.db"), legacy_folder=str(folder))
+    assert [draft["id"] for draft in manager.list_drafts(10)] == ["draft_4"]
+    assert not folder.exists()
+    assert (tmp_path / "drafts.migrated-2" / "draft_5.json").exists()
@@ -0,0 +1,31 @@
+import json
+import google_services
+
+GMAIL_SCOPES = google_services.GOOGLE_APIS["gmail"][1]
+
+def write_token(tmp_path, scopes):
+    path = tmp_path / "token_gmail.json"
+    path.write_text(json.dumps({"token": "t", "refresh_token": "r", "client_id": "c", "client_secret": "s",
+                                "token_uri": "https://oauth2.googleapis.com/token", "scopes": scopes}))
+    return path
+
+def test_token_missing_a_scope_is_reauthorized(tmp_path, monkeypatch):
+    write_token(tmp_path, ["https://www.googleapis.com/auth/gmail.send"])
+    (tmp_path / "credentials.json").write_text("{}")
+    monkeypatch.setattr(google_services, "project_root", str(tmp_path))
+    flows = []
+
+    class Flow:
+        def run_local_server(self, port):
+            flows.append(port)
+            return type("Creds", (), {"to_json": lambda self: json.dumps({"scopes": GMAIL_SCOPES})})()
+
+    monkeypatch.setattr(google_services.InstalledAppFlow, "from_client_secrets_file", lambda path, scopes: Flow())
+    google_services._load_credentials("token_gmail.json", GMAIL_SCOPES)
+    assert flows == [0]
+    assert json.loads((tmp_path / "token_gmail.json").read_text())["scopes"] == GMAIL_SCOPES
+
+def test_token_with_every_scope_is_kept(tmp_path):
+    assert google_services._has_scopes(str(write_token(tmp_path, GMAIL_SCOPES + ["openid"])), GMAIL_SCOPES)
+    assert google_services._has_scopes(str(write_token(tmp_path, " ".join(GMAIL_SCOPES))), GMAIL_SCOPES)
+    assert not google_services._has_scopes(str(write_token(tmp_path, [])), GMAIL_SCOPES)
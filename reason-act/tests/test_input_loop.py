@@ -0,0 +1,75 @@
+import os
+import signal
+import threading
+import time
+import pytest
+from input_loop import InputLoop
+
+class Pipe:
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.writer_open = True
+
+    def write(self, data: bytes):
+        os.write(self.write_fd, data)
+
+    def close_writer(self):
+        # end of input for the loop
+        os.close(self.write_fd)
+        self.writer_open = False
+
+    def close(self):
+        os.close(self.read_fd)
+        if self.writer_open:
+            self.close_writer()
+
+@pytest.fixture
+def pipe_loop():
+    pipe = Pipe()
+    loop = InputLoop()
+    loop.add_source(pipe.read_fd, name="pipe")
+    yield loop, pipe
+    loop.close()
+    pipe.close()
+
+def test_line_from_another_thread_wakes_get(pipe_loop):
+    loop, pipe = pipe_loop
+    threading.Timer(0.05, pipe.write, (b"hello\r\n",)).start()
+    start = time.monotonic()
+    assert loop.get(timeout=5) == ("pipe", "hello")
+    assert time.monotonic() - start < 1
+
+def test_lines_are_split_and_partial_lines_wait(pipe_loop):
+    loop, pipe = pipe_loop
+    pipe.write(b"first\nsecond\nthi")
+    assert loop.get(timeout=1) == ("pipe", "first")
+    assert loop.get(timeout=1) == ("pipe", "second")
+    assert loop.get(timeout=0.05) is None
+    pipe.write(b"rd\n")
+    assert loop.get(timeout=1) == ("pipe", "third")
+
+def test_end_of_input_delivers_the_rest_and_stops(pipe_loop):
+    loop, pipe = pipe_loop
+    pipe.write(b"no newline")
+    pipe.close_writer()
+    assert loop.get(timeout=1) == ("pipe", "no newline")
+    assert loop.get(timeout=1) is None
+    assert loop.stopped
+
+def test_put_and_stop_from_other_threads(pipe_loop):
+    loop, _ = pipe_loop
+    threading.Timer(0.05, loop.put, ("turn on the lights",)).start()
+    assert loop.get(timeout=5) == ("voice", "turn on the lights")
+    threading.Timer(0.05, loop.stop).start()
+    assert loop.get() is None
+
+def test_sigterm_stops_the_loop(pipe_loop):
+    loop, _ = pipe_loop
+    previous = signal.getsignal(signal.SIGTERM)
+    try:
+        loop.install_signal_handlers((signal.SIGTERM,))
+        threading.Timer(0.05, os.kill, (os.getpid(), signal.SIGTERM)).start()
+        assert loop.get(timeout=5) is None
+        assert loop.stopped
+    finally:
+        signal.signal(signal.SIGTERM, previous)
@@ -0,0 +1,39 @@
+from llm_cache import LLMCache
+
+PARAMS = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}]}
+
+def last_used(cache, params):
+    return cache.conn.execute("SELECT last_used FROM responses WHERE key = ?", (LLMCache.make_key(params),)).fetchone()[0]
+
+def test_hits_are_written_in_batches(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.db"), flush_every=2)
+    other = {**PARAMS, "model": "other"}
+    cache.set(PARAMS, "hello")
+    cache.set(other, "hey")
+    stored = last_used(cache, PARAMS)
+    assert cache.get(PARAMS) == "hello"
+    assert cache.get(PARAMS) == "hello"
+    assert last_used(cache, PARAMS) == stored
+    assert cache.get(other) == "hey"
+    assert cache.get({**PARAMS, "model": "missing"}) is None
+    assert cache.stats() == {"hits": 3, "misses": 1, "size": 2}
+    assert last_used(cache, PARAMS) > stored
+
+def test_eviction_sees_unflushed_hits(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.db"), max_entries=2)
+    first, second = PARAMS, {**PARAMS, "temperature": 0}
+    cache.set(first, "a")
+    cache.set(second, "b")
+    cache.get(first)
+    cache.set({**PARAMS, "temperature": 1}, "c")
+    assert cache.get(first) == "a"
+    assert cache.get(second) is None
+
+def test_close_writes_pending_hits(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = LLMCache(path)
+    cache.set(PARAMS, "hello")
+    stored = last_used(cache, PARAMS)
+    cache.get(PARAMS)
+    cache.close()
+    assert last_used(LLMCache(path), PARAMS) > stored
@@ -0,0 +1,37 @@
+import glob
+import gzip
+import json
+import os
+from log_writer import LogWriter
+
+def read_records(directory, prefix="interactions"):
+    records = []
+    for path in sorted(glob.glob(os.path.join(directory, f"{prefix}-*.jsonl.gz"))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            records += [json.loads(line) for line in f]
+    with open(os.path.join(directory, f"{prefix}.jsonl"), encoding="utf-8") as f:
+        records += [json.loads(line) for line in f]
+    return records
+
+def test_every_record_survives_rotation(tmp_path):
+    writer = LogWriter(str(tmp_path), max_bytes=20_000)
+    for i in range(2000):
+        writer.write({"i": i, "query": f"query {i}", "response": "x" * 50})
+    writer.close()
+    assert writer.written == 2000 and writer.dropped == 0
+    assert glob.glob(str(tmp_path / "interactions-*.jsonl.gz"))
+    assert not glob.glob(str(tmp_path / "interactions-*.jsonl"))
+    # rotated segments sort by name in the order they were written
+    assert [record["i"] for record in read_records(str(tmp_path))] == list(range(2000))
+
+def test_unserializable_and_late_records_are_counted(tmp_path):
+    writer = LogWriter(str(tmp_path))
+    writer.write({"ok": 1})
+    # default=str covers most objects, a circular reference still can't be written
+    circular = {}
+    circular["self"] = circular
+    writer.write(circular)
+    writer.close()
+    writer.write({"late": 1})
+    assert writer.written == 1 and writer.dropped == 2
+    assert read_records(str(tmp_path)) == [{"ok": 1}]
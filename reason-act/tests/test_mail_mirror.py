@@ -0,0 +1,66 @@
+import pytest
+from fake_google import FakeGmailService, FakeHttpError
+from mail_mirror import MailMirror
+
+@pytest.fixture
+def gmail():
+    gmail = FakeGmailService()
+    gmail.add_message("Alice <alice@example.com>", "Quarterly report", "numbers attached", date=1700000000)
+    gmail.add_message("Bob <bob@example.com>", "Lunch", "tomorrow at noon?", date=1700003600)
+    return gmail
+
+@pytest.fixture
+def mirror(gmail):
+    return MailMirror(gmail, path=":memory:", sync_interval=0)
+
+def stored(mirror):
+    # what is in the mirror, without the sync a read does first
+    return [dict(row) for row in mirror.conn.execute("SELECT * FROM messages")]
+
+def subjects(messages):
+    return sorted(message["subject"] for message in messages)
+
+def test_full_sync_then_search(mirror):
+    assert subjects(mirror.recent()) == ["Lunch", "Quarterly report"]
+    assert subjects(mirror.search(keywords="report")) == ["Quarterly report"]
+    assert subjects(mirror.search(sender="bob")) == ["Lunch"]
+
+def test_incremental_sync_applies_adds_and_deletes(gmail, mirror):
+    mirror.sync()
+    lunch = next(id for id, message in gmail.mailbox.items() if message["snippet"].startswith("tomorrow"))
+    gmail.delete_message(lunch)
+    gmail.add_message("Carol <carol@example.com>", "Offsite", "agenda inside")
+    assert subjects(mirror.recent()) == ["Offsite", "Quarterly report"]
+    assert mirror._get_state("history_id") == str(gmail.history_id)
+
+def test_message_gone_before_fetch_is_deleted(gmail, mirror):
+    mirror.sync()
+    new = gmail.add_message("Carol <carol@example.com>", "Offsite")
+    # removed without a history record, the get 404s
+    del gmail.mailbox[new]
+    mirror.sync()
+    assert subjects(mirror.recent()) == ["Lunch", "Quarterly report"]
+
+def test_transient_error_keeps_messages_and_history_id(gmail, mirror):
+    mirror.sync()
+    history_id = mirror._get_state("history_id")
+    report = next(iter(gmail.mailbox))
+    gmail.mailbox[report]["labelIds"].append("IMPORTANT")
+    gmail._record("labelsAdded", report)
+    gmail.get_errors[report] = 503
+
+    with pytest.raises(FakeHttpError):
+        mirror.sync()
+    assert subjects(stored(mirror)) == ["Lunch", "Quarterly report"]
+    assert mirror._get_state("history_id") == history_id
+
+    # the next sync retries from the same history id
+    del gmail.get_errors[report]
+    assert subjects(mirror.search(label="IMPORTANT")) == ["Quarterly report"]
+
+def test_transient_error_on_full_sync_stores_nothing(gmail):
+    gmail.get_errors[next(iter(gmail.mailbox))] = 429
+    mirror = MailMirror(gmail, path=":memory:", sync_interval=0)
+    with pytest.raises(FakeHttpError):
+        mirror.sync()
+    assert mirror._get_state("history_id") is None
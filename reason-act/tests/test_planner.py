@@ -0,0 +1,82 @@
+import json
+import pytest
+from planner import PlanError, PlanExecutor, parse_plan
+from tools import GetContactEmail, Tool
+
+class SpyTool(Tool):
+    def __init__(self, name: str, result: str = "ok", parallel_safe: bool = True):
+        super().__init__()
+        self.name = name
+        self.result = result
+        self.parallel_safe = parallel_safe
+        self.calls = []
+
+    def __call__(self, input: str) -> str:
+        self.calls.append(input)
+        return self.result.format(input=input)
+
+def test_parse_plan_adds_placeholder_dependencies():
+    tools = {"a": SpyTool("a"), "b": SpyTool("b")}
+    steps = parse_plan('```json\n{"steps": [{"id": 1, "action": "a", "input": ["x"]}, '
+                       '{"id": "2", "action": "b", "input": ["{{1}}"]}]}\n```', tools)
+    assert [step["id"] for step in steps] == ["1", "2"]
+    assert steps[1]["depends_on"] == ["1"]
+
+@pytest.mark.parametrize("plan", [
+    "not json",
+    '{"steps": {}}',
+    '{"steps": [{"id": "s1", "action": "unknown"}]}',
+    '{"steps": [{"id": "s1", "action": "a"}, {"id": "s1", "action": "a"}]}',
+    '{"steps": [{"id": "s1", "action": "a", "depends_on": ["s9"]}]}',
+])
+def test_parse_plan_rejects_invalid_plans(plan):
+    with pytest.raises(PlanError):
+        parse_plan(plan, {"a": SpyTool("a")})
+
+def test_executor_substitutes_results_in_dependency_order():
+    tools = {"upper": SpyTool("upper", "{input}!"), "echo": SpyTool("echo", "got {input}")}
+    steps = parse_plan(json.dumps({"steps": [
+        {"id": "s1", "action": "upper", "input": ["hi"]},
+        {"id": "s2", "action": "echo", "input": ["{{s1}}"]},
+    ]}), tools)
+    results = PlanExecutor(tools).execute(steps)
+    assert results == {"s1": "hi!", "s2": "got hi!"}
+
+def test_executor_skips_dependents_of_an_exception():
+    class Failing(SpyTool):
+        def __call__(self, input):
+            raise RuntimeError("boom")
+
+    tools = {"fail": Failing("fail"), "echo": SpyTool("echo")}
+    steps = parse_plan(json.dumps({"steps": [
+        {"id": "s1", "action": "fail", "input": ["x"]},
+        {"id": "s2", "action": "echo", "input": ["{{s1}}"]},
+    ]}), tools)
+    results = PlanExecutor(tools).execute(steps)
+    assert results["s1"] == "Error: boom"
+    assert results["s2"].startswith("Skipped")
+    assert tools["echo"].calls == []
+
+def test_unknown_contact_stops_the_email_chain():
+    write_email = SpyTool("write_email", "Email draft saved with ID: draft_1", parallel_safe=False)
+    send_email = SpyTool("send_email", "Email sent successfully. Message ID: m1", parallel_safe=False)
+    tools = {"get_contact_email": GetContactEmail(), "write_email": write_email, "send_email": send_email}
+    steps = parse_plan(json.dumps({"steps": [
+        {"id": "s1", "action": "get_contact_email", "input": ["nobody"]},
+        {"id": "s2", "action": "write_email", "input": {"to": "{{s1}}", "subject": "Hi", "body": "Hello"}},
+        {"id": "s3", "action": "send_email", "input": ["{{s2}}"]},
+    ]}), tools)
+    results = PlanExecutor(tools).execute(steps)
+    assert results["s1"] == "No email found for contact: nobody"
+    assert results["s2"].startswith("Skipped") and results["s3"].startswith("Skipped")
+    assert write_email.calls == [] and send_email.calls == []
+
+def test_error_result_stops_dependents():
+    tools = {"search": SpyTool("search", "An error occurred while searching emails: quota"), "echo": SpyTool("echo")}
+    steps = parse_plan(json.dumps({"steps": [
+        {"id": "s1", "action": "search", "input": ["x"]},
+        {"id": "s2", "action": "echo", "input": ["{{s1}}"]},
+    ]}), tools)
+    results = PlanExecutor(tools).execute(steps)
+    assert results["s2"].startswith("Skipped")
+    assert tools["echo"].calls == []
@@ -0,0 +1,59 @@
+import json
+from types import SimpleNamespace
+import pytest
+from agent import ReActAgent
+from email_manager import EmailManager
+from recording import Recording, ReplayMismatch
+from registry import build_tools
+from replay import replay
+
+class FakeCompletions:
+    # answers with the last user message, so every query gets its own answer
+    def create(self, messages, **kwargs):
+        question = [message["content"] for message in messages if message["role"] == "user"][-1]
+        content = f"Thought: easy\nFinal Answer: you said {question}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+def record_session(path, workdir, queries):
+    recording = Recording(str(path))
+    email_manager = EmailManager(str(workdir / "drafts.db"), legacy_folder=str(workdir / "drafts"))
+    agent = ReActAgent(build_tools(email_manager), email_manager=email_manager, stream_thoughts=False,
+                       log_dir=str(workdir / "logs"), recording=recording)
+    agent.gpt_client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    agent.async_gpt_client = agent.gpt_client
+    try:
+        for query in queries:
+            recording.record_query("react", query, agent.run(query))
+    finally:
+        agent.log_writer.close()
+        recording.close()
+
+def test_sessions_appended_to_one_file_replay_separately(tmp_path):
+    path = tmp_path / "session.jsonl"
+    record_session(path, tmp_path / "first", ["hello", "what's up"])
+    record_session(path, tmp_path / "second", ["hello again"])
+
+    recording = Recording(str(path), replay=True)
+    sessions = []
+    for index in range(len(recording.sessions)):
+        recording.select_session(index)
+        sessions.append([query["query"] for query in recording.queries])
+    assert sessions == [["hello", "what's up"], ["hello again"]]
+
+    results, mismatches = replay(str(path), strict=True, workdir=str(tmp_path / "replay"))
+    assert [result["query"] for result in results] == ["hello", "what's up", "hello again"]
+    assert all(result["identical"] for result in results)
+    assert mismatches == 0
+
+def test_files_without_session_markers_are_one_session(tmp_path):
+    path = tmp_path / "old.jsonl"
+    path.write_text("\n".join(json.dumps(event) for event in [
+        {"type": "clock", "time": "2024-05-01T09:00:00"},
+        {"type": "query", "mode": "react", "query": "hi", "answer": "hello"},
+    ]) + "\n")
+    recording = Recording(str(path), replay=True)
+    assert len(recording.sessions) == 1
+    assert [query["query"] for query in recording.queries] == ["hi"]
+    assert recording.now().hour == 9
+    with pytest.raises(ReplayMismatch):
+        recording.now()
@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+import numpy as np
+from stt import SAMPLE_RATE, AudioBuffer, StreamingTranscriber
+
+WORD_SECONDS = 0.5
+WORD_SAMPLES = int(WORD_SECONDS * SAMPLE_RATE)
+
+def word_audio(index: int) -> bytes:
+    # every half second of audio is one word, its level says which one, so the fake model can read it back
+    return np.full(WORD_SAMPLES, 0.1 + index / 1000, dtype=np.float32).tobytes()
+
+class FakeModel:
+    # one word per complete half second of the audio it is given, with word timestamps like faster-whisper
+    def __init__(self):
+        self.decoded_seconds = []
+        self.prompts = []
+
+    def transcribe(self, audio, beam_size, word_timestamps, initial_prompt):
+        self.decoded_seconds.append(len(audio) / SAMPLE_RATE)
+        self.prompts.append(initial_prompt)
+        words = []
+        for i in range(len(audio) // WORD_SAMPLES):
+            index = round((float(audio[i * WORD_SAMPLES]) - 0.1) * 1000)
+            words.append(SimpleNamespace(word=f" w{index}", start=i * WORD_SECONDS, end=(i + 1) * WORD_SECONDS))
+        return [SimpleNamespace(words=words)], None
+
+def test_words_are_committed_while_the_button_is_held():
+    model = FakeModel()
+    buffer = AudioBuffer()
+    transcriber = StreamingTranscriber(lambda: model, buffer=buffer, vad=False)
+    # 12 s utterance, an interim pass every second, driven by hand instead of the background thread
+    for index in range(24):
+        buffer.write(word_audio(index))
+        if index % 2:
+            transcriber._transcribe_pending(final=False)
+    assert transcriber.committed_samples == 11 * SAMPLE_RATE
+
+    text = transcriber.finish()
+    assert text == " ".join(f"w{index}" for index in range(24))
+    # only the second after the last agreed word is left at release
+    assert model.decoded_seconds[-1] == 1.0
+    assert model.prompts[-1].endswith(" w21")
+
+def test_long_window_without_agreement_is_committed():
+    model = FakeModel()
+    buffer = AudioBuffer()
+    transcriber = StreamingTranscriber(lambda: model, buffer=buffer, vad=False, max_window=2)
+    for index in range(6):
+        buffer.write(word_audio(index))
+    transcriber._transcribe_pending(final=False)
+    # 3 s > max_window on the first pass, everything but the last word goes in
+    assert "".join(transcriber.committed_words) == " w0 w1 w2 w3 w4"
+    assert transcriber.committed_samples == 5 * WORD_SAMPLES
@@ -0,0 +1,62 @@
+import multiprocessing
+import queue
+import numpy as np
+import pytest
+import stt_worker
+from stt_worker import SharedAudioBuffer, TranscriptionWorker
+
+@pytest.fixture
+def slots():
+    buffers = [SharedAudioBuffer(multiprocessing.Value('q', 0), seconds=2) for _ in range(2)]
+    yield [(buffer.shm.name, buffer.shared_length, multiprocessing.Value('b', 0)) for buffer in buffers]
+    for buffer in buffers:
+        buffer.close()
+        buffer.shm.unlink()
+
+def drain(results):
+    items = []
+    while True:
+        items.append(results.get(timeout=5))
+        if items[-1][0] == "stopped":
+            return items
+
+def test_model_that_fails_to_load_is_reported(slots, monkeypatch):
+    def fail():
+        raise OSError("no such model")
+    monkeypatch.setattr(stt_worker, "initialize_whisper", fail)
+    results = queue.Queue()
+    stt_worker._worker_main(slots, queue.Queue(), results, 2, False, 1.0, False)
+    assert drain(results) == [("error", "Could not load the whisper model: no such model", None), ("stopped", None, None)]
+
+def test_failed_transcription_frees_its_slot(slots, monkeypatch):
+    class BrokenModel:
+        def transcribe(self, audio, **kwargs):
+            raise RuntimeError("decoder crashed")
+    monkeypatch.setattr(stt_worker, "initialize_whisper", BrokenModel)
+    buffer = SharedAudioBuffer(slots[0][1], seconds=2, name=slots[0][0])
+    buffer.write(np.full(1600, 0.5, dtype=np.float32).tobytes())
+    buffer.close()
+    slots[0][2].value = 1
+
+    commands, results = queue.Queue(), queue.Queue()
+    for command in [("start", 0), ("finish", 0), ("stop", None)]:
+        commands.put(command)
+    stt_worker._worker_main(slots, commands, results, 2, False, 1.0, False)
+    assert drain(results) == [("error", "Transcription failed: decoder crashed", None), ("stopped", None, None)]
+    assert slots[0][2].value == 0
+
+class DeadProcess:
+    exitcode = 1
+
+    def is_alive(self):
+        return False
+
+def test_dead_worker_is_surfaced_instead_of_hanging():
+    errors = []
+    worker = TranscriptionWorker.__new__(TranscriptionWorker)
+    worker.process, worker.results, worker.error, worker.on_error = DeadProcess(), queue.Queue(), None, errors.append
+    # the reader gives up once the process is gone and nothing is left to read
+    worker._read_results()
+    assert errors == ["The transcription worker exited with code 1"]
+    with pytest.raises(RuntimeError, match="exited with code 1"):
+        worker.start_utterance()
@@ -0,0 +1,19 @@
+import pytest
+from tools import GoogleCalendarCreateEvent, GoogleCalendarUpdateEvent
+
+def test_event_details_accept_json_and_dict_literals():
+    tool = GoogleCalendarCreateEvent()
+    expected = {"summary": "Dentist", "start": {"dateTime": "2024-05-01T10:00:00"}, "reminders": {"useDefault": True}}
+    assert tool._parse_event_details('{"summary": "Dentist", "start": {"dateTime": "2024-05-01T10:00:00"}, '
+                                     '"reminders": {"useDefault": true}}') == expected
+    assert tool._parse_event_details(" {'summary': 'Dentist', 'start': {'dateTime': '2024-05-01T10:00:00'}, "
+                                     "'reminders': {'useDefault': True}} ") == expected
+
+@pytest.mark.parametrize("text", [
+    "__import__('os').system('echo owned')",
+    "{'summary': __import__('os').getcwd()}",
+    "['not', 'a', 'dict']",
+])
+def test_event_details_are_never_evaluated(text):
+    with pytest.raises(ValueError):
+        GoogleCalendarUpdateEvent()._parse_event_details(text)
@@ -0,0 +1,18 @@
+import importlib
+import config
+import transport
+
+def test_host_limits_are_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("HTTP_HOST_LIMITS", "https://api.tavily.com=4, https://api.openweathermap.org=2,")
+    try:
+        assert importlib.reload(config).HTTP_HOST_LIMITS == {"https://api.tavily.com": 4, "https://api.openweathermap.org": 2}
+    finally:
+        monkeypatch.delenv("HTTP_HOST_LIMITS")
+        importlib.reload(config)
+
+def test_shared_session_uses_the_host_limits(monkeypatch):
+    monkeypatch.setattr(transport, "HTTP_HOST_LIMITS", {"https://api.tavily.com": 3})
+    monkeypatch.setattr(transport, "_session", None)
+    session = transport.get_session()
+    assert session.get_adapter("https://api.tavily.com/search")._pool_maxsize == 3
+    assert session.get_adapter("https://example.com/")._pool_maxsize == config.HTTP_POOL_MAXSIZE
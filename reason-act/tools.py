@@ -1,42 +1,91 @@
-import requests
+# heavy dependencies (requests, spotipy, google api clients) are imported where they are used,
+# importing this module only has to be enough to describe the tools
 from abc import ABC, abstractmethod
-from typing import Any, Dict
-from config import TAVILY_API_KEY, SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET, OPENWEATHER_API_KEY
+from typing import Any, Dict, Optional
+from config import TAVILY_API_KEY, SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET, OPENWEATHER_API_KEY, TAVILY_SEARCH_URL, OPENWEATHER_URL
 import time
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
 import subprocess
 from colorama import Fore, init
-import os
-from google.oauth2.credentials import Credentials as OAuth2Credentials
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
 from datetime import datetime
-from google.auth.exceptions import RefreshError
-from googleapiclient.discovery import build
 from email.mime.text import MIMEText
 import base64
-from utils import AutoRefreshingCredentials
 from email_manager import EmailManager
 from contacts import get_contact_email
 import json
+import ast
 import webbrowser
 import threading
+import asyncio
+from cache import TTLCache
+from telemetry import telemetry
 
 init(autoreset=True)
 
 class Tool(ABC):
-    def __init__(self, name: str, args: list[str], description: str, interactive: bool = False):
-        self.name = name
-        self.args = args
-        self.description = description
-        self.interactive = interactive
+    # metadata is declared on the class, so the registry can describe a tool without building it
+    name: str = ""
+    args: list[str] = []
+    description: str = ""
+    interactive: bool = False
+    # read-only tools that can run at the same time as other actions of the same step
+    parallel_safe: bool = False
+    # results are cached for cache_ttl seconds, only read-only tools whose answers can be a bit stale set it
+    cache_ttl: Optional[float] = None
+    cache_size: int = 128
+    # tools report failures in their result, a result starting with one of these is an error
+    error_prefixes: tuple[str, ...] = ("Error", "An error")
+
+    def __init__(self):
+        self.cache = TTLCache(self.cache_ttl, self.cache_size) if self.cache_ttl else None
 
     @abstractmethod
     def __call__(self, input: Any) -> str:
         pass
 
+    def invoke(self, input: Any) -> str:
+        # every call lands in the tool_seconds histogram, labelled with the tool and how the call went
+        with telemetry.span("tool", tool=self.name) as span:
+            key, result = self._cache_lookup(input)
+            if result is not None:
+                span["outcome"] = "cached"
+                return result
+            span["outcome"] = "exception"
+            result = self(input)
+            self._cache_store(key, result)
+            span["outcome"] = self._outcome(result)
+        return result
+
+    def _outcome(self, result: str) -> str:
+        return "error" if self.is_error(result) else "ok"
+
+    async def ainvoke(self, input: Any) -> str:
+        # blocking tools run on a worker thread so the event loop keeps going
+        return await asyncio.to_thread(self.invoke, input)
+
+    def cache_key(self, input: Any) -> str:
+        # same arguments modulo case and spacing hit the same entry
+        return ",".join(" ".join(part.split()).lower() for part in str(input).split(','))
+
+    def is_error(self, result: str) -> bool:
+        return result.startswith(self.error_prefixes)
+
+    def is_cacheable(self, result: str) -> bool:
+        return not self.is_error(result)
+
+    def _cache_lookup(self, input: Any) -> tuple[Optional[str], Optional[str]]:
+        if self.cache is None:
+            return None, None
+        key = self.cache_key(input)
+        return key, self.cache.get(key)
+
+    def _cache_store(self, key: Optional[str], result: str):
+        if key is not None and self.is_cacheable(result):
+            self.cache.set(key, result)
+
+    def result_value(self, result: str) -> str:
+        # what a plan placeholder pointing to this tool gets replaced with
+        return result
+
     def get_info(self) -> Dict[str, str]:
         return {
             "name": self.name,
@@ -44,15 +93,38 @@ class Tool(ABC):
             "description": self.description
         }
 
+class AsyncTool(Tool):
+    # for tools with a native async implementation
+    @abstractmethod
+    async def __call__(self, input: Any) -> str:
+        pass
+
+    def invoke(self, input: Any) -> str:
+        return asyncio.run(self.ainvoke(input))
+
+    async def ainvoke(self, input: Any) -> str:
+        with telemetry.span("tool", tool=self.name) as span:
+            key, result = self._cache_lookup(input)
+            if result is not None:
+                span["outcome"] = "cached"
+                return result
+            span["outcome"] = "exception"
+            result = await self(input)
+            self._cache_store(key, result)
+            span["outcome"] = self._outcome(result)
+        return result
+
 class InternetSearch(Tool):
-    def __init__(self):
-        super().__init__(
-            name="internet_search",
-            args=["query", "search_depth", "include_images", "include_image_descriptions"],
-            description="Searches the internet for information. Input should be a query string, optionally followed by search depth ('basic' or 'advanced', default is 'basic'), include_images: used to specify if images should be included in the search results (True/False), and include_image_descriptions: used to specify if image descriptions should be included in the search results (True/False)."
-        )
+    name = "internet_search"
+    args = ["query", "search_depth", "include_images", "include_image_descriptions"]
+    description = "Searches the internet for information. Input should be a query string, optionally followed by search depth ('basic' or 'advanced', default is 'basic'), include_images: used to specify if images should be included in the search results (True/False), and include_image_descriptions: used to specify if image descriptions should be included in the search results (True/False)."
+    parallel_safe = True
+    cache_ttl = 60 * 60
 
     def __call__(self, input: str) -> str:
+        import requests
+        from transport import get_session
+
         try:
             parts = input.split(',')
             query = parts[0].strip()
@@ -71,7 +143,7 @@ class InternetSearch(Tool):
                 "include_image_descriptions": include_image_descriptions
             }
 
-            response = requests.post("https://api.tavily.com/search", json=payload)
+            response = get_session().post(TAVILY_SEARCH_URL, json=payload)
             response.raise_for_status()
             results = response.json()
 
@@ -107,15 +179,24 @@ class InternetSearch(Tool):
             return f"Error performing internet search: {str(e)}"
 
 class PlayMusic(Tool):
+    name = "play_music"
+    args = ["spotify_query", "type"]
+    description = "Search and play a song on Spotify. Input query should be a song name followed by the artist. Type should be 'track', 'album' or 'playlist'."
+
     def __init__(self):
-        super().__init__(
-            name="play_music",
-            args=["spotify_query", "type"],
-            description="Search and play a song on Spotify. Input query should be a song name followed by the artist. Type should be 'track', 'album' or 'playlist'."
-        )
-        self.sp = self._setup_spotify()
+        super().__init__()
+        self._sp = None
+
+    @property
+    def sp(self):
+        if self._sp is None:
+            self._sp = self._setup_spotify()
+        return self._sp
 
     def _setup_spotify(self):
+        import spotipy
+        from spotipy.oauth2 import SpotifyOAuth
+
         scope = "user-library-read user-read-playback-state user-modify-playback-state"
         return spotipy.Spotify(auth_manager=SpotifyOAuth(
             scope=scope,
@@ -129,6 +210,8 @@ class PlayMusic(Tool):
         return self.search_and_play(query, type)
 
     def search_and_play(self, query, type, retry=False):
+        from spotipy.exceptions import SpotifyException
+
         print(Fore.WHITE + f"\nSearching for {type}: {query}")
         
         results = self.sp.search(q=query, type=type)
@@ -158,23 +241,25 @@ class PlayMusic(Tool):
             else:
                 self.sp.start_playback(device_id=device_id, context_uri=item_uri)
             return f"Now playing: {item_name}"
-        except spotipy.exceptions.SpotifyException as e:
+        except SpotifyException as e:
             return f"Error starting playback: {e}\nThis error may occur if Spotify is not active on the selected device. Try manually starting playback on your device, then run this script again."
         except Exception as e:
             return f"An unexpected error occurred: {e}\nPlease check your internet connection and Spotify account status."
 
 class GetWeather(Tool):
-    def __init__(self):
-        super().__init__(
-            name="get_weather",
-            args=["city_name"],
-            description="Retrieves weather information for a specific city. Input should be a city name."
-        )
+    name = "get_weather"
+    args = ["city_name"]
+    description = "Retrieves weather information for a specific city. Input should be a city name."
+    parallel_safe = True
+    cache_ttl = 10 * 60
 
     def __call__(self, city_name: str) -> str:
+        import requests
+        from transport import get_session
+
         try:
-            response = requests.get(
-                "http://api.openweathermap.org/data/2.5/weather",
+            response = get_session().get(
+                OPENWEATHER_URL,
                 params={
                     "q": city_name,
                     "appid": OPENWEATHER_API_KEY,
@@ -188,182 +273,155 @@ class GetWeather(Tool):
             return f"Error getting weather information: {str(e)}"
 
 class GoogleCalendarBase(Tool):
-    def __init__(self, name: str, args: list[str], description: str):
-        super().__init__(name, args, description)
-        self.service = self._get_calendar_service()
-
-    def _get_calendar_service(self):
-        SCOPES = ['https://www.googleapis.com/auth/calendar']
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(script_dir)
-        token_path = os.path.join(project_root, 'token.json')
-        credentials_path = os.path.join(project_root, 'credentials.json')
-
+    @property
+    def service(self):
+        # shared and built on first use, startup doesn't wait on google
+        from google_services import get_service
+        return get_service('calendar')
+
+    @property
+    def calendar(self):
+        # local copy of the calendar, the write tools update it with what the api returns
+        from calendar_cache import get_calendar_cache
+        return get_calendar_cache()
+
+    def _parse_event_details(self, text: str) -> Dict[str, Any]:
+        # json or a python dict literal, never evaluated as code: in plan mode the text can contain search results
+        # or email content pasted in from other steps
+        text = text.strip()
         try:
-            if os.path.exists(token_path):
-                creds = AutoRefreshingCredentials(token_path, SCOPES)
-                if creds.expired and creds.refresh_token:
-                    creds.refresh(Request())
-            else:
-                if not os.path.exists(credentials_path):
-                    raise FileNotFoundError(f"credentials.json file not found at {credentials_path}")
-                flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
-                creds = flow.run_local_server(port=0)
-                
-                # Save the credentials for the next run
-                with open(token_path, 'w') as token:
-                    token.write(creds.to_json())
-
-            return build('calendar', 'v3', credentials=creds)
-        except (RefreshError, ValueError) as e:
-            print(f"Error with token: {e}")
-            print("You may need to re-authenticate. Deleting the existing token and retrying...")
-            if os.path.exists(token_path):
-                os.remove(token_path)
-            return self._get_calendar_service()  # Recursive call to retry authentication
-        except Exception as e:
-            print(f"An unexpected error occurred during authentication: {e}")
-            raise
+            details = json.loads(text)
+        except json.JSONDecodeError:
+            try:
+                details = ast.literal_eval(text)
+            except (ValueError, SyntaxError) as e:
+                raise ValueError(f"Event details must be a dictionary: {e}")
+        if not isinstance(details, dict):
+            raise ValueError("Event details must be a dictionary")
+        return details
 
 class GoogleCalendarCreateEvent(GoogleCalendarBase):
-    def __init__(self):
-        super().__init__(
-            name="google_calendar_create_event",
-            args=["event_details"],
-            description="Create a new event in Google Calendar. Event details should be a dictionary with the following format:\n"
-                        "{'summary': 'Event name', 'description': 'Event description', 'start': {'dateTime': 'YYYY-MM-DDTHH:MM:SS', 'timeZone': 'Time zone'}, 'end': {'dateTime': 'YYYY-MM-DDTHH:MM:SS', 'timeZone': 'Time zone'}}"
-        )
+    name = "google_calendar_create_event"
+    args = ["event_details"]
+    description = ("Create a new event in Google Calendar. Event details should be a dictionary with the following format:\n"
+                   "{'summary': 'Event name', 'description': 'Event description', 'start': {'dateTime': 'YYYY-MM-DDTHH:MM:SS', 'timeZone': 'Time zone'}, 'end': {'dateTime': 'YYYY-MM-DDTHH:MM:SS', 'timeZone': 'Time zone'}}")
 
     def __call__(self, input: str) -> str:
-        event_details = eval(input.strip())
+        event_details = self._parse_event_details(input)
         event = self.service.events().insert(calendarId='primary', body=event_details).execute()
+        self.calendar.upsert(event)
         return f"Event created: {event.get('htmlLink')}"
 
 class GoogleCalendarUpdateEvent(GoogleCalendarBase):
-    def __init__(self):
-        super().__init__(
-            name="google_calendar_update_event",
-            args=["event_id", "event_details"],
-            description="Update an existing event in Google Calendar. Provide the event ID and updated event details. Event details should be a dictionary with the following format:\n"
-                        "{'summary': 'Event name', 'description': 'Event description', 'start': {'dateTime': 'YYYY-MM-DDTHH:MM:SS', 'timeZone': 'America/Argentina/Buenos_Aires'}, 'end': {'dateTime': 'YYYY-MM-DDTHH:MM:SS', 'timeZone': 'America/Argentina/Buenos_Aires'}}"
-        )
+    name = "google_calendar_update_event"
+    args = ["event_id", "event_details"]
+    description = ("Update an existing event in Google Calendar. Provide the event ID and updated event details. Event details should be a dictionary with the following format:\n"
+                   "{'summary': 'Event name', 'description': 'Event description', 'start': {'dateTime': 'YYYY-MM-DDTHH:MM:SS', 'timeZone': 'America/Argentina/Buenos_Aires'}, 'end': {'dateTime': 'YYYY-MM-DDTHH:MM:SS', 'timeZone': 'America/Argentina/Buenos_Aires'}}")
 
     def __call__(self, input: str) -> str:
         event_id, event_details = input.split(',', 1)
         event_id = event_id.strip()
-        event_details = eval(event_details.strip())
+        event_details = self._parse_event_details(event_details)
         updated_event = self.service.events().update(calendarId='primary', eventId=event_id, body=event_details).execute()
+        self.calendar.upsert(updated_event)
         return f"Event updated: {updated_event['updated']}"
 
 class GoogleCalendarDeleteEvent(GoogleCalendarBase):
-    def __init__(self):
-        super().__init__(
-            name="google_calendar_delete_event",
-            args=["event_id"],
-            description="Delete an event from Google Calendar. Provide the event ID."
-        )
+    name = "google_calendar_delete_event"
+    args = ["event_id"]
+    description = "Delete an event from Google Calendar. Provide the event ID."
 
     def __call__(self, event_id: str) -> str:
         self.service.events().delete(calendarId='primary', eventId=event_id.strip()).execute()
+        self.calendar.remove(event_id.strip())
         return "Event deleted"
 
 class GoogleCalendarFindEventInRange(GoogleCalendarBase):
-    def __init__(self):
-        super().__init__(
-            name="find_event_in_range",
-            args=["event_name", "start_date", "end_date"],
-            description="Find events within a date range in Google Calendar. Event name is a string (could be not specified and use empty with "" to general searches), start and end date must be in the format YYYY-MM-DD."
-        )
+    name = "find_event_in_range"
+    args = ["event_name", "start_date", "end_date"]
+    description = "Find events within a date range in Google Calendar. Event name is a string (could be not specified and use empty with "" to general searches), start and end date must be in the format YYYY-MM-DD."
+    parallel_safe = True
 
     def __call__(self, input: str) -> str:
         event_name, start_date, end_date = input.split(',', 2)
         print(Fore.WHITE + f"\nSearching for events in range: {event_name} from {start_date} to {end_date}")
         start_date = datetime.fromisoformat(start_date.strip())
         end_date = datetime.fromisoformat(end_date.strip())
-        events_result = self.service.events().list(
-            calendarId='primary',
-            timeMin=start_date.isoformat() + 'Z',
-            timeMax=end_date.isoformat() + 'Z',
-            q=event_name.strip(),
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        events = events_result.get('items', [])
-        return f"Events matching '{event_name}' between {start_date.date()} and {end_date.date()}: {events}"
+        event_name = event_name.strip().strip('"')
+        events = self.calendar.find(start_date, end_date, event_name)
+        if not events:
+            return f"No events matching '{event_name}' between {start_date.date()} and {end_date.date()}."
+        return f"Events matching '{event_name}' between {start_date.date()} and {end_date.date()}:\n" + "\n".join(self._format_event(event) for event in events)
+
+    def _format_event(self, event: Dict[str, Any]) -> str:
+        start = event['start'].get('dateTime', event['start'].get('date'))
+        end = event['end'].get('dateTime', event['end'].get('date'))
+        line = f"- {event.get('summary', '(no title)')} from {start} to {end} (id: {event['id']})"
+        if event.get('location'):
+            line += f", at {event['location']}"
+        return line
 
 class GoogleGmailBase(Tool):
-    def __init__(self, name: str, args: list[str], description: str):
-        super().__init__(name, args, description)
-        self.service = self._get_gmail_service()
-
-    def _get_gmail_service(self):
-        SCOPES = ['https://www.googleapis.com/auth/gmail.send']
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(script_dir)
-        token_path = os.path.join(project_root, 'token_gmail.json')
-        credentials_path = os.path.join(project_root, 'credentials.json')
-
-        try:
-            if os.path.exists(token_path):
-                creds = AutoRefreshingCredentials(token_path, SCOPES)
-                if creds.expired and creds.refresh_token:
-                    creds.refresh(Request())
-            else:
-                if not os.path.exists(credentials_path):
-                    raise FileNotFoundError(f"credentials.json file not found at {credentials_path}")
-                flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
-                creds = flow.run_local_server(port=0)
-                
-                # Save the credentials for the next run
-                with open(token_path, 'w') as token:
-                    token.write(creds.to_json())
-
-            return build('gmail', 'v1', credentials=creds)
-        except (RefreshError, ValueError) as e:
-            print(f"Error with token: {e}")
-            print("You may need to re-authenticate. Deleting the existing token and retrying...")
-            if os.path.exists(token_path):
-                os.remove(token_path)
-            return self._get_gmail_service()  
-        except Exception as e:
-            print(f"An unexpected error occurred during authentication: {e}")
-            raise
+    @property
+    def service(self):
+        from google_services import get_service
+        return get_service('gmail')
+
+    @property
+    def mirror(self):
+        # local copy of the inbox, synced incrementally before it is read
+        from mail_mirror import get_mail_mirror
+        return get_mail_mirror()
+
+    def _format_emails(self, emails: list[Dict[str, Any]]) -> str:
+        return "\n".join(
+            f"From: {email['sender']}\nDate: {email['date'] or 'Unknown Date'}\nSubject: {email['subject']}\nSnippet: {email['snippet']}\n"
+            for email in emails
+        )
 
 class ReadEmails(GoogleGmailBase):
-    def __init__(self):
-        super().__init__(
-            name="read_emails",
-            args=["max_results"],
-            description="Read recent emails from your Gmail inbox. Specify the maximum number of emails to retrieve."
-        )
+    name = "read_emails"
+    args = ["max_results"]
+    description = "Read recent emails from your Gmail inbox. Specify the maximum number of emails to retrieve."
+    parallel_safe = True
 
     def __call__(self, max_results: str) -> str:
         try:
-            max_results = int(max_results.strip())
-            results = self.service.users().messages().list(userId='me', labelIds=['INBOX'], maxResults=max_results).execute()
-            messages = results.get('messages', [])
-
-            if not messages:
+            emails = self.mirror.recent(int(max_results.strip()))
+            if not emails:
                 return "No messages found."
+            return self._format_emails(emails)
+        except Exception as e:
+            return f"An error occurred while reading emails: {str(e)}"
 
-            email_summaries = []
-            for message in messages:
-                msg = self.service.users().messages().get(userId='me', id=message['id']).execute()
-                subject = next((header['value'] for header in msg['payload']['headers'] if header['name'] == 'Subject'), 'No Subject')
-                sender = next((header['value'] for header in msg['payload']['headers'] if header['name'] == 'From'), 'Unknown Sender')
-                email_summaries.append(f"From: {sender}\nSubject: {subject}\n")
+class SearchEmails(GoogleGmailBase):
+    name = "search_emails"
+    args = ["keywords", "sender", "start_date", "end_date"]
+    description = ("Search your Gmail emails by keywords in the sender, subject or snippet. Any argument can be empty with \"\", "
+                   "sender is a name or address, start and end date must be in the format YYYY-MM-DD.")
+    parallel_safe = True
 
-            return "\n".join(email_summaries)
+    def __call__(self, input: str) -> str:
+        try:
+            keywords, sender, start_date, end_date = (input.split(',', 3) + ["", "", ""])[:4]
+            keywords, sender = keywords.strip().strip('"'), sender.strip().strip('"')
+            start_date, end_date = start_date.strip().strip('"'), end_date.strip().strip('"')
+            print(Fore.WHITE + f"\nSearching emails: {keywords} from {sender or 'anyone'} between {start_date or '-'} and {end_date or '-'}")
+            emails = self.mirror.search(keywords, sender, start_date, end_date)
+            if not emails:
+                return "No emails match the search."
+            return self._format_emails(emails)
         except Exception as e:
-            return f"An error occurred while reading emails: {str(e)}"
+            return f"An error occurred while searching emails: {str(e)}"
 
 class WriteEmail(Tool):
+    name = "write_email"
+    args = ["email_data"]
+    description = "Write or edit an email draft. Provide a JSON string containing 'to' (name or email), 'subject', 'body', and optionally 'draft_id'. Use null for draft_id if creating a new draft."
+    error_prefixes = ("An error", "Invalid JSON", "Missing required field")
+
     def __init__(self, email_manager: EmailManager):
-        super().__init__(
-            name="write_email",
-            args=["email_data"],
-            description="Write or edit an email draft. Provide a JSON string containing 'to' (name or email), 'subject', 'body', and optionally 'draft_id'. Use null for draft_id if creating a new draft."
-        )
+        super().__init__()
         self.email_manager = email_manager
 
     def __call__(self, input: str) -> str:
@@ -389,13 +447,17 @@ class WriteEmail(Tool):
         except Exception as e:
             return f"An error occurred while writing the email: {str(e)}"
 
+    def result_value(self, result: str) -> str:
+        return result.split("ID: ")[-1] if result.startswith("Email draft saved") else result
+
 class SendEmail(GoogleGmailBase):
+    name = "send_email"
+    args = ["draft_id"]
+    description = "Send an email from a draft. Provide the draft_id of the email to send."
+    error_prefixes = ("An error", "No draft found")
+
     def __init__(self, email_manager: EmailManager):
-        super().__init__(
-            name="send_email",
-            args=["draft_id"],
-            description="Send an email from a draft. Provide the draft_id of the email to send."
-        )
+        super().__init__()
         self.email_manager = email_manager
 
     def __call__(self, input: str) -> str:
@@ -429,12 +491,13 @@ class SendEmail(GoogleGmailBase):
             raise
 
 class DeleteEmail(Tool):
+    name = "delete_email"
+    args = ["draft_id"]
+    description = "Delete an email draft. Provide the draft_id of the email to delete."
+    error_prefixes = ("An error", "No draft found")
+
     def __init__(self, email_manager: EmailManager):
-        super().__init__(
-            name="delete_email",
-            args=["draft_id"],
-            description="Delete an email draft. Provide the draft_id of the email to delete."
-        )
+        super().__init__()
         self.email_manager = email_manager
 
     def __call__(self, input: str) -> str:
@@ -448,12 +511,14 @@ class DeleteEmail(Tool):
             return f"An error occurred while deleting the email draft: {str(e)}"
         
 class GetDrafts(Tool):
+    name = "get_drafts"
+    args = ["action", "parameter"]
+    description = "List email drafts or get full content of a specific draft. Action should be 'list' or 'full'. For 'list', parameter is the number of drafts to retrieve. For 'full', parameter is the draft ID."
+    parallel_safe = True
+    error_prefixes = ("An error", "Invalid", "No draft found")
+
     def __init__(self, email_manager: EmailManager):
-        super().__init__(
-            name="get_drafts",
-            args=["action", "parameter"],
-            description="List email drafts or get full content of a specific draft. Action should be 'list' or 'full'. For 'list', parameter is the number of drafts to retrieve. For 'full', parameter is the draft ID."
-        )
+        super().__init__()
         self.email_manager = email_manager
 
     def __call__(self, input: str) -> str:
@@ -491,12 +556,12 @@ class GetDrafts(Tool):
         return f"Draft ID: {draft_id}\nTo: {draft['to']}\nSubject: {draft['subject']}\nBody:\n{draft['body']}"
 
 class GetContactEmail(Tool):
-    def __init__(self):
-        super().__init__(
-            name="get_contact_email",
-            args=["contact_name"],
-            description="Get the email address for a given contact name. If not found, returns None."
-        )
+    name = "get_contact_email"
+    args = ["contact_name"]
+    description = "Get the email address for a given contact name. If not found, returns None."
+    parallel_safe = True
+    cache_ttl = 60 * 60
+    error_prefixes = ("No email found",)
 
     def __call__(self, contact_name: str) -> str:
         email = get_contact_email(contact_name.strip())
@@ -505,6 +570,12 @@ class GetContactEmail(Tool):
         else:
             return f"No email found for contact: {contact_name}"
 
+    def result_value(self, result: str) -> str:
+        # the not found message must never end up in a "to" field
+        if not result.startswith("Email for"):
+            raise ValueError(result)
+        return result.split(": ")[-1]
+
 def get_all_tool_info(tools: list[Tool]) -> list[Dict[str, str]]:
     return [tool.get_info() for tool in tools]
 
@@ -0,0 +1,73 @@
+import random
+import threading
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import HTTP_TIMEOUT, HTTP_RETRIES, HTTP_POOL_MAXSIZE, HTTP_HOST_LIMITS
+
+class JitteredRetry(Retry):
+    def get_backoff_time(self) -> float:
+        # full jitter, so tools retrying at the same time don't hit the api in lockstep
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff else 0
+
+class PooledSession(requests.Session):
+    def __init__(self, timeout: float = HTTP_TIMEOUT, retries: int = HTTP_RETRIES, backoff_factor: float = 0.5,
+                 pool_maxsize: int = HTTP_POOL_MAXSIZE, host_limits: Optional[Dict[str, int]] = None):
+        super().__init__()
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+
+        self.mount("https://", self._make_adapter(pool_maxsize))
+        self.mount("http://", self._make_adapter(pool_maxsize))
+        # a host with its own limit gets its own adapter, e.g. {"https://api.tavily.com": 4}
+        for prefix, maxsize in (host_limits or {}).items():
+            self.mount(prefix, self._make_adapter(maxsize))
+
+    def _make_adapter(self, maxsize: int) -> HTTPAdapter:
+        retry = JitteredRetry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            # the POSTs we do are searches, safe to repeat
+            allowed_methods=frozenset(["GET", "POST"]),
+            raise_on_status=False,
+        )
+        # block=True makes callers wait for a free connection instead of opening throwaway ones
+        return HTTPAdapter(pool_connections=4, pool_maxsize=maxsize, max_retries=retry, pool_block=True)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        stats = {}
+        for adapter in set(self.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                stats[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                    "connections_opened": pool.num_connections,
+                    "requests": pool.num_requests,
+                    "idle": pool.pool.qsize() if pool.pool is not None else 0,
+                }
+        return stats
+
+_session: Optional[PooledSession] = None
+_session_lock = threading.Lock()
+
+def get_session() -> PooledSession:
+    # one keep-alive session shared by every http tool in the process
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = PooledSession(host_limits=HTTP_HOST_LIMITS)
+    return _session
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    return _session.pool_stats() if _session is not None else {}
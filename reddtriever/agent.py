@@ -1,11 +1,16 @@
+import asyncio
 from datetime import datetime
 from openai import AsyncOpenAI
 from search import SearchTool
 from config import OPENAI_API_KEY
+from llm_cache import LLMCache
 
 class Reddtriever:
-    def __init__(self):
+    def __init__(self, llm_cache: LLMCache = None, llm_cache_sites: tuple = ("rephrase", "response")):
         self.gpt_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        # identical prompts are answered from disk, only for the call sites listed in llm_cache_sites
+        self.llm_cache = llm_cache
+        self.llm_cache_sites = llm_cache_sites
         self.search_tool = SearchTool()
         self.chat_history = []
 
@@ -35,13 +40,12 @@ class Reddtriever:
             Rephrased question:
             """
 
-        response = await self.gpt_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        rephrased_query = await self._complete("rephrase", {
+            "model": "gpt-4o-mini",
+            "messages": [
                 {"role": "system", "content": f"{system_prompt}"},
             ]
-        ) 
-        rephrased_query = response.choices[0].message.content.strip()
+        })
         return rephrased_query if rephrased_query != "not_needed" else None
 
     async def generate_response(self, context):
@@ -64,18 +68,30 @@ class Reddtriever:
             </context>
 
             If you think there's nothing relevant in the search results, you can say that 'Hmm, sorry I could not find any relevant information on this topic. Would you like me to search again or ask something else?'.
-            Anything between the `context` is retrieved from Reddit and is not a part of the conversation with the user. Today's date is {datetime.now().isoformat()}
+            Anything between the `context` is retrieved from Reddit and is not a part of the conversation with the user. Today's date is {datetime.now().strftime("%Y-%m-%d")}
             """
 
-        response = await self.gpt_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        generated_response = await self._complete("response", {
+            "model": "gpt-4o-mini",
+            "messages": [
                 {"role": "system", "content": f"{system_prompt}"},
             ]
-        ) 
-        generated_response = response.choices[0].message.content.strip()
+        })
         return generated_response
 
+    async def _complete(self, site, params):
+        use_cache = self.llm_cache is not None and site in self.llm_cache_sites
+        # sqlite blocks, the cache is read and written off the event loop
+        if use_cache:
+            cached = await asyncio.to_thread(self.llm_cache.get, params)
+            if cached is not None:
+                return cached
+        response = await self.gpt_client.chat.completions.create(**params)
+        content = response.choices[0].message.content.strip()
+        if use_cache:
+            await asyncio.to_thread(self.llm_cache.set, params, content)
+        return content
+
     async def generate(self, query):
         rephrased_query = await self.rephrase_query(query)
         if rephrased_query:
@@ -0,0 +1,63 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+import httpx
+from agent import Reddtriever
+
+# runs the queries read from stdin (a json list) through Reddtriever.generate, --concurrency agents at the same time,
+# and prints the latencies as json. started by reason-act/benchmark.py, which points OPENAI_BASE_URL at its fake
+# openai server and passes the url of its fake tavily server
+
+class LocalTavilyClient:
+    # the search() of AsyncTavilyClient, against another base url
+    def __init__(self, base_url: str):
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=30)
+
+    async def search(self, query: str, **kwargs) -> dict:
+        response = await self.client.post("/search", json={"query": query, **kwargs})
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self):
+        await self.client.aclose()
+
+async def run(queries: list, concurrency: int, rounds: int, tavily_url: str) -> dict:
+    agents = []
+    for _ in range(concurrency):
+        agent = Reddtriever()
+        agent.search_tool.client = LocalTavilyClient(tavily_url)
+        await agent.initialize()
+        agents.append(agent)
+
+    async def worker(agent: Reddtriever) -> list:
+        latencies = []
+        for _ in range(rounds):
+            for query in queries:
+                start = time.perf_counter()
+                await agent.generate(query)
+                latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(worker(agent) for agent in agents))
+    wall = time.perf_counter() - start
+
+    for agent in agents:
+        await agent.search_tool.client.close()
+        await agent.gpt_client.close()
+    return {"latencies": [latency for latencies in results for latency in latencies], "wall": wall}
+
+def main():
+    parser = argparse.ArgumentParser(description="Reddtriever side of reason-act/benchmark.py")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--tavily-url", required=True)
+    args = parser.parse_args()
+
+    queries = json.load(sys.stdin)
+    print(json.dumps(asyncio.run(run(queries, args.concurrency, args.rounds, args.tavily_url))))
+
+if __name__ == "__main__":
+    main()
@@ -5,3 +5,7 @@ load_dotenv()
 
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# opt-in on-disk cache of llm responses, strict turns a cache miss into an error (deterministic test runs)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+LLM_CACHE_STRICT = os.getenv("LLM_CACHE_STRICT", "false").lower() == "true"
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# the cache is shared with the other app, it lives in common/ at the repo root
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+from common.llm_cache import LLMCache, LLMCacheMiss
+
+__all__ = ["LLMCache", "LLMCacheMiss"]
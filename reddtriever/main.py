@@ -1,25 +1,32 @@
 import asyncio
 from agent import Reddtriever
 from search import SearchTool
-from utils import log_interaction 
+from utils import log_interaction, close_log
+from llm_cache import LLMCache
+from config import LLM_CACHE_PATH, LLM_CACHE_STRICT
 
 async def main():
-    reddtriever = Reddtriever()
+    llm_cache = LLMCache(LLM_CACHE_PATH, strict=LLM_CACHE_STRICT) if LLM_CACHE_PATH else None
+    reddtriever = Reddtriever(llm_cache=llm_cache)
     search_tool = SearchTool()
 
     await reddtriever.initialize()
     await search_tool.initialize()
 
-    while True:
-        query = input("Enter your query (or 'quit' to exit): ")
-        if query.lower() == 'quit':
-            break
+    try:
+        while True:
+            query = input("Enter your query (or 'quit' to exit): ")
+            if query.lower() == 'quit':
+                break
 
-        response, docs_retrieved, rephrased_query = await reddtriever.generate(query)
-        print("="*100)
-        print(response)
+            response, docs_retrieved, rephrased_query = await reddtriever.generate(query)
+            print("="*100)
+            print(response)
 
-        await log_interaction(query, docs_retrieved, response, rephrased_query)
+            await log_interaction(query, docs_retrieved, response, rephrased_query)
+    finally:
+        # whatever is still queued is written before exit
+        close_log()
 
 if __name__ == "__main__":
     asyncio.run(main())
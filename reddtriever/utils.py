@@ -1,26 +1,26 @@
 import os
-import json
-import asyncio
 from datetime import datetime
+from log_writer import LogWriter
 
-async def log_interaction(user_prompt, docs_retrieved, llm_answer, rephrased_query):
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    log_folder = os.path.join(current_dir, "logs")
-    os.makedirs(log_folder, exist_ok=True)
+_log_writer = None
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = os.path.join(log_folder, f"interaction_{timestamp}.json")
+def get_log_writer() -> LogWriter:
+    global _log_writer
+    if _log_writer is None:
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        _log_writer = LogWriter(os.path.join(current_dir, "logs"))
+    return _log_writer
 
-    log_data = {
+async def log_interaction(user_prompt, docs_retrieved, llm_answer, rephrased_query):
+    # only queues the record, the file write happens on the writer thread and never blocks the event loop
+    get_log_writer().write({
         "timestamp": datetime.now().isoformat(),
         "user_prompt": user_prompt,
         "rephrased_query": rephrased_query,
         "docs_retrieved": docs_retrieved,
         "llm_answer": llm_answer
-    }
-
-    async def write_log():
-        with open(log_file, "w", encoding="utf-8") as f:
-            json.dump(log_data, f, ensure_ascii=False, indent=2)
+    })
 
-    asyncio.create_task(write_log())
+def close_log():
+    if _log_writer is not None:
+        _log_writer.close()